@@ -37,7 +37,7 @@ if __name__ == "__main__":
             f"python simulate.py -m FL",
             f"python simulate.py -m VAL -sd {sdate.strftime('%Y-%m-%d')} -ed {edate.strftime('%Y-%m-%d')}",
             f"python simulate.py -m JS",
-            f"python simulate.py -m EA -sd {sdate.strftime('%Y-%m-%d')} -ed {edate.strftime('%Y-%m-%d')}",
+            f"python simulate.py -m EA -sd {sdate.strftime('%Y-%m-%d')} -ed {edate.strftime('%Y-%m-%d')} -cd .cache/fitacf/ -idx .cache/sd_index.db",
         ]
         for command in commands:
             print(f"Command: {command}")
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+"""
+    benchmark.py: module to benchmark the fitacf ingest path on synthetic data
+"""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import argparse
+import datetime as dt
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+from loguru import logger
+
+sys.path.extend(["py/", "py/geo/"])
+from fetchUtils import FetchData, SDAnalysis
+from synthUtils import create_synthetic_archive
+
+
+class Benchmark(object):
+    """
+    Times the stages of the ingest path and keeps one row per stage
+    with wall time, throughput and memory (process max RSS after the
+    stage, and the traced peak of the stage if trace_memory is set)
+    """
+
+    def __init__(self, nrec, nbytes, trace_memory=False):
+        """
+        nrec: number of records in the files
+        nbytes: raw (decompressed) DMAP bytes in the files
+        trace_memory: Trace peak memory of every stage with tracemalloc,
+                      this slows down the Python-heavy stages
+        """
+        self.nrec = nrec
+        self.nbytes = nbytes
+        self.trace_memory = trace_memory
+        self.rows = []
+        return
+
+    def run(self, stage, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) as one stage and return its result
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        t = time.perf_counter()
+        out = func(*args, **kwargs)
+        t = time.perf_counter() - t
+        row = dict(
+            stage=stage,
+            seconds=t,
+            records_per_s=self.nrec / t if t > 0 else float("nan"),
+            MB_per_s=self.nbytes / t / 1e6 if t > 0 else float("nan"),
+            max_rss_MB=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+        )
+        if self.trace_memory:
+            row["peak_MB"] = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+        self.rows.append(row)
+        logger.info(f"{stage}: {t:.3f} s")
+        return out
+
+    def report(self):
+        """
+        Stage table as a dataframe
+        """
+        return pd.DataFrame(self.rows).set_index("stage")
+
+
+def discover(fds, date_range):
+    for fd in fds:
+        fd.date_range, fd.files = date_range, None
+        fd._create_files()
+    return sum(len(fd.files) for fd in fds)
+
+
+def decode(fds):
+    return [list(fd._iter_records()) for fd in fds]
+
+
+def parse(fds, records):
+    return [
+        fd._parse_data(rec, fd.s_params, fd.v_params, "scan")[1]
+        for fd, rec in zip(fds, records)
+    ]
+
+
+def to_pandas(fds, scans):
+    return [fd.scans_to_pandas(s) for fd, s in zip(fds, scans)]
+
+
+def fetch_frames(fds):
+    for fd in fds:
+        fd.frame = fd.fetch_frame()
+    return fds
+
+
+def aggregate(rads, date_range, fds):
+    sd = SDAnalysis(date_range, rads)
+    sd.dat, sd.errors = dict(zip(rads, fds)), {}
+    sd.fig = plt.figure(figsize=(6, 2.5), dpi=150)
+    timings = sd.plot_summary_TS_from_axes(sd.fig.add_subplot(111))
+    plt.close(sd.fig)
+    return timings
+
+
+def run_benchmark(args):
+    """
+    Generate the synthetic archive and time each stage of the ingest path
+    """
+    rads = args.rads.split("-")
+    date_range = [args.start_date, args.start_date + dt.timedelta(hours=args.hours)]
+    root = args.root if args.root else tempfile.mkdtemp(prefix="sd-bench-")
+    dip = None
+    if args.dip:
+        onset = date_range[0] + (date_range[1] - date_range[0]) / 2
+        dip = [onset, onset + dt.timedelta(minutes=60)]
+    files = create_synthetic_archive(
+        root,
+        rads,
+        date_range,
+        nbeams=args.beams,
+        nrang=args.gates,
+        scan_time=args.scan_time,
+        density=args.density,
+        dip=dip,
+    )
+    FetchData.regex = os.path.join(root, "{year}/{ftype}/{rad}/{date}.*.{ftype}.bz2")
+    # Throughput is over the whole files, reading stops at the window end
+    nrec, nbytes = sum(f[1] for f in files), sum(f[2] for f in files)
+    logger.info(
+        f"Archive {root}: {len(files)} files, {nrec} records, "
+        + f"{nbytes / 1e6:.1f} MB raw, "
+        + f"{sum(os.path.getsize(f[0]) for f in files) / 1e6:.1f} MB bz2"
+    )
+
+    bench = Benchmark(nrec, nbytes, args.trace_memory)
+    fds = [FetchData(r, None, verbose=False, n_procs=args.n_procs) for r in rads]
+    bench.run("discovery", discover, fds, date_range)
+    records = bench.run("decode", decode, fds)
+    scans = bench.run("_parse_data", parse, fds, records)
+    del records
+    bench.run("scans_to_pandas", to_pandas, fds, scans)
+    del scans
+    fds = [
+        FetchData(r, date_range, verbose=False, n_procs=args.n_procs) for r in rads
+    ]
+    bench.run("fetch_frame", fetch_frames, fds)
+    bench.run("aggregation", aggregate, rads, date_range, fds)
+    report = bench.report()
+    print(report.round(3).to_string())
+    if args.out:
+        report.to_csv(args.out)
+    if not args.root:
+        shutil.rmtree(root)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-r", "--rads", default="bks", type=str, help="Radars / Sep: '-', fhe-fhw-..."
+    )
+    parser.add_argument(
+        "-sd", "--start_date", default="2024-02-22T16:00", type=dt.datetime.fromisoformat, help="ISOformat - YYYY-MM-DD:HH:mm:ss"
+    )
+    parser.add_argument(
+        "-hr", "--hours", default=6, type=int, help="Hours of data to generate"
+    )
+    parser.add_argument(
+        "-b", "--beams", default=16, type=int, help="Beams per scan"
+    )
+    parser.add_argument(
+        "-g", "--gates", default=75, type=int, help="Range gates per beam"
+    )
+    parser.add_argument(
+        "-st", "--scan_time", default=60, type=int, help="Scan duration (s)"
+    )
+    parser.add_argument(
+        "-de", "--density", default=0.3, type=float, help="Fraction of gates with echoes"
+    )
+    parser.add_argument(
+        "-dp", "--dip", action="store_true", help="Add an SWF-like echo blackout"
+    )
+    parser.add_argument(
+        "-np", "--n_procs", default=1, type=int, help="Number of processes to decode fitacf files"
+    )
+    parser.add_argument(
+        "-tm", "--trace_memory", action="store_true", help="Trace peak memory of every stage (slower)"
+    )
+    parser.add_argument(
+        "-rt", "--root", default=None, type=str, help="Folder to keep the synthetic archive (default: temporary)"
+    )
+    parser.add_argument(
+        "-o", "--out", default=None, type=str, help="CSV file of the stage timings"
+    )
+    args = parser.parse_args()
+    for k in vars(args).keys():
+        print("     ", k, "->", str(vars(args)[k]))
+    run_benchmark(args)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+"""bz2Utils.py: utility module to decompress bz2 files block-parallel."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import bz2
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+# 48-bit magics of a compressed block (pi) and of the end of stream (sqrt pi)
+BLOCK_MAGIC = 0x314159265359
+EOS_MAGIC = 0x177245385090
+
+
+def find_magic(data, magic):
+    """
+    Bit offsets of a 48-bit magic in data. Blocks are not byte aligned:
+    at bit shift k the magic fully covers 5 (6 if k=0) bytes, these are
+    searched for directly and the candidates are checked bit-wise.
+    """
+    offsets = []
+    for k in range(8):
+        window = (magic << (8 - k)).to_bytes(7, "big")
+        pattern, lead = (window[:6], 0) if k == 0 else (window[1:6], 1)
+        j = data.find(pattern)
+        while j >= 0:
+            start = 8 * (j - lead) + k
+            if (start >= 0) and (get_bits(data, start, 48) == magic):
+                offsets.append(start)
+            j = data.find(pattern, j + 1)
+    return sorted(offsets)
+
+
+def get_bits(data, start, nbits):
+    """
+    nbits of data from bit offset start as an int
+    """
+    seg = data[start // 8 : (start + nbits + 7) // 8]
+    val = int.from_bytes(seg, "big")
+    return (val >> (8 * len(seg) - start % 8 - nbits)) & ((1 << nbits) - 1)
+
+
+def block_stream(data, start, end):
+    """
+    Rewrap the block in bits [start, end) as a standalone bz2 stream:
+    header, the block, end of stream magic and a stream CRC which for
+    a single block is the block CRC (32 bits after the block magic)
+    """
+    nbits = end - start
+    val = get_bits(data, start, nbits)
+    crc = get_bits(data, start + 48, 32)
+    val = (((val << 48) | EOS_MAGIC) << 32) | crc
+    nbits += 80
+    pad = (-nbits) % 8
+    return b"BZh9" + (val << pad).to_bytes((nbits + pad) // 8, "big")
+
+
+def decompress(data, n_threads=1):
+    """
+    Decompress bz2 data (single or multi-stream) with the blocks
+    spread over n_threads, output is reassembled in block order.
+    Falls back to serial decompression if the blocks cannot be split
+    (e.g. a magic pattern occurring by chance inside a block).
+    """
+    if n_threads <= 1:
+        return bz2.decompress(data)
+    blocks = find_magic(data, BLOCK_MAGIC)
+    if len(blocks) < 2:
+        return bz2.decompress(data)
+    ends = find_magic(data, EOS_MAGIC)
+    bounds = sorted(blocks + ends)
+    # Each block ends where the next block or end of stream starts
+    nxt = dict(zip(bounds[:-1], bounds[1:]))
+    try:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            parts = list(
+                pool.map(
+                    lambda b: bz2.decompress(block_stream(data, b, nxt[b])), blocks
+                )
+            )
+        return b"".join(parts)
+    except (OSError, ValueError, KeyError, EOFError):
+        logger.warning("Block split failed, decompressing serially")
+        return bz2.decompress(data)
+
+
+def read(fname, n_threads=1):
+    """
+    Read and decompress a bz2 file
+    """
+    with open(fname, "rb") as fp:
+        data = fp.read()
+    return decompress(data, n_threads)
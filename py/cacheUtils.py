@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""cacheUtils.py: utility module to cache decoded / decompressed fitacf<v> data on local disk."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import bz2
+import glob
+import hashlib
+import mmap
+import os
+import shutil
+import warnings
+
+import pandas as pd
+from loguru import logger
+
+
+class LRUFolder(object):
+    """
+    Local folder of entries derived from source files, one file per
+    source file keyed by its path, size and mtime. Entries are evicted
+    least-recently-used first once the folder exceeds max_size.
+    """
+
+    # File extension of the entries
+    ext = ""
+
+    def __init__(self, folder, max_size=5.0, verbose=False):
+        """
+        folder: local folder to hold the cache
+        max_size: size bound of the cache in GB
+        """
+        self.folder = folder
+        self.max_size = max_size * 1e9
+        self.verbose = verbose
+        os.makedirs(self.folder, exist_ok=True)
+        return
+
+    def _get_path(self, fname):
+        """
+        Cache file name for a source file from (path, size, mtime)
+        """
+        st = os.stat(fname)
+        key = f"{os.path.abspath(fname)}|{st.st_size}|{st.st_mtime_ns}"
+        return os.path.join(
+            self.folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + self.ext
+        )
+
+    def evict(self):
+        """
+        Remove least recently used entries beyond max_size
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.folder, "*" + self.ext)):
+            try:
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+            except FileNotFoundError:
+                continue
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+        return
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+
+
+class FrameCache(LRUFolder):
+    """
+    Persistent cache of decoded columnar blocks (recs, gates), one HDF5
+    file per source file.
+    """
+
+    ext = ".h5"
+
+    def get(self, fname):
+        """
+        Read cached block of a source file, None on miss
+        """
+        path = self._get_path(fname)
+        if os.path.exists(path):
+            try:
+                recs = pd.read_hdf(path, key="recs")
+                gates = pd.read_hdf(path, key="gates")
+                # Touch the entry so eviction follows last use
+                os.utime(path)
+                if self.verbose:
+                    logger.info(f"Cache hit: {fname}")
+                return recs, gates
+            except Exception:
+                logger.warning(f"Corrupted cache entry {path}, dropping")
+                self._remove(path)
+        return None
+
+    def put(self, fname, block):
+        """
+        Store decoded block of a source file and evict if required
+        """
+        path = self._get_path(fname)
+        tmp = path + f".{os.getpid()}.tmp"
+        recs, gates = block
+        with warnings.catch_warnings():
+            # Mixed / None typed columns are pickled by PyTables
+            warnings.simplefilter("ignore")
+            recs.to_hdf(tmp, key="recs", mode="w", complevel=1, complib="blosc")
+            gates.to_hdf(tmp, key="gates", mode="a", complevel=1, complib="blosc")
+        os.replace(tmp, path)
+        self.evict()
+        return
+
+
+class LocalMirror(LRUFolder):
+    """
+    Decompress-once mirror of fitacf<v>.bz2 files as raw DMAP files on
+    fast local storage, read back through mmap.
+    """
+
+    ext = ".dmap"
+
+    def __init__(self, folder, max_size=20.0, verbose=False):
+        """
+        folder: local folder to hold the mirror
+        max_size: size bound of the mirror in GB
+        """
+        super().__init__(folder, max_size, verbose)
+        return
+
+    def get(self, fname):
+        """
+        Path of the raw DMAP copy of a source file, decompressed on miss
+        """
+        if not fname.endswith(".bz2"):
+            return fname
+        path = self._get_path(fname)
+        if os.path.exists(path):
+            # Touch the entry so eviction follows last use
+            os.utime(path)
+            if self.verbose:
+                logger.info(f"Mirror hit: {fname}")
+            return path
+        tmp = path + f".{os.getpid()}.tmp"
+        with bz2.open(fname, "rb") as src, open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp, path)
+        if self.verbose:
+            logger.info(f"Mirrored: {fname}")
+        self.evict()
+        return path
+
+    def open(self, fname):
+        """
+        Read-only mmap of the raw DMAP copy of a source file
+        """
+        with open(self.get(fname), "rb") as fp:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
@@ -19,13 +19,12 @@ import cartopy
 import matplotlib.pyplot as plt
 import numpy
 import numpy as np
-import pydarn
 import tidUtils
 from cartopy.feature.nightshade import Nightshade
 from cartopy.mpl.geoaxes import GeoAxes
 from descartes import PolygonPatch
 from matplotlib.projections import register_projection
-from rad_fov import CalcFov
+from geometryUtils import get_fov, get_hdw
 from shapely.geometry import LineString, MultiLineString, Polygon, mapping
 
 
@@ -326,7 +325,7 @@ class SDCarto(GeoAxes):
         annotate=True,
     ):
         """Adding the radar location"""
-        hdw = pydarn.read_hdw_file(rad)
+        hdw = get_hdw(rad)
         lat, lon = hdw.geographic.lat, hdw.geographic.lon
         if "aacgm" in self.coords:
             lat, lon = self.to_aagcm(lat, lon)
@@ -391,9 +390,9 @@ class SDCarto(GeoAxes):
         fov_dir="front",
     ):
         """Overlay radar FoV"""
-        hdw = pydarn.read_hdw_file(rad)
-        fov = CalcFov(hdw=hdw, model=model, fov_dir=fov_dir)
-        latFull, lonFull = fov.latFull, fov.lonFull
+        hdw = get_hdw(rad)
+        fov = get_fov(rad, model=model, fov_dir=fov_dir)
+        latFull, lonFull = fov["latFull"], fov["lonFull"]
         self.maxGate = maxGate
         lcolor = lineColor
         from numpy import concatenate, transpose, vstack
@@ -476,11 +475,10 @@ class SDCarto(GeoAxes):
             df = df[df.slist <= maxGate]
         if len(df) > 0:
             # TODO
-            hdw = pydarn.read_hdw_file(rad)
-            fov = CalcFov(hdw=hdw, model=model, fov_dir=fov_dir)
+            fov = get_fov(rad, model=model, fov_dir=fov_dir)
             # lats, lons = pydarn.Coords.GEOGRAPHIC(hdw.stid)
             # lats, lons = lats.T, lons.T
-            lats, lons = fov.latCenter, fov.lonCenter
+            lats, lons = fov["latCenter"], fov["lonCenter"]
             Xb, Yg, Px = tidUtils.get_gridded_parameters(
                 df, xparam="bmnum", yparam="slist", zparam=p_name
             )
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+"""climUtils.py: utility module to build quiet-day echo climatologies."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import datetime as dt
+import os
+
+import numpy as np
+from fetchUtils import FetchData
+from loguru import logger
+
+
+class EchoClimatology(object):
+    """
+    Quiet-day echo counts of one radar per UT bin of the day: median
+    and MAD over the train_days days preceding a date. Daily profiles
+    (echo counts per bin, from the radar-day echo cubes) are cached in
+    one .npz per radar and only missing days are added on update, the
+    climatology of a date is fitted once and baselines are then served
+    by bin index in O(1).
+    """
+
+    def __init__(
+        self,
+        rad,
+        folder,
+        train_days=30,
+        cube_dir=None,
+        time_res=60,
+        exclude=[],
+        verbose=False,
+        **kwargs,
+    ):
+        """
+        rad: radar code
+        folder: folder of the profile cache
+        train_days: number of preceding days in the climatology
+        cube_dir: folder of the echo cubes (None: not stored)
+        time_res: UT bin (s), same as the echo cubes
+        exclude: disturbed days (e.g. flare days) left out of the fit
+        kwargs: FetchData.fetch options (n_procs, cache_dir, ...)
+        """
+        self.rad = rad
+        self.folder = folder
+        self.train_days = train_days
+        self.cube_dir = cube_dir
+        self.time_res = time_res
+        self.exclude = set(self._day(d) for d in exclude)
+        self.verbose = verbose
+        self.kwargs = kwargs
+        self.nbins = int(86400 / time_res)
+        self.path = os.path.join(folder, f"{rad}.{time_res}s.clim.npz")
+        self.profiles = {}
+        self._fits = {}
+        self._load()
+        return
+
+    @staticmethod
+    def _day(date):
+        return dt.datetime(date.year, date.month, date.day)
+
+    def _load(self):
+        """
+        Read the cached daily profiles
+        """
+        if os.path.exists(self.path):
+            with np.load(self.path) as f:
+                for d, p in zip(f["dates"], f["profiles"]):
+                    self.profiles[d.astype("datetime64[s]").item()] = p
+            if self.verbose:
+                logger.info(f"Climatology {self.rad}: {len(self.profiles)} days")
+        return
+
+    def _save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        days = sorted(self.profiles.keys())
+        tmp = self.path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as fp:
+            np.savez(
+                fp,
+                dates=np.array(days, dtype="datetime64[s]"),
+                profiles=np.array([self.profiles[d] for d in days]),
+            )
+        os.replace(tmp, self.path)
+        return
+
+    def _profile(self, day):
+        """
+        Echo counts per UT bin of a day, NaN for the bins without
+        soundings and all NaN if the radar has no echoes that day. None
+        if the day's data is not available or partial (not cached)
+        """
+        cube = FetchData.fetch_echo_cube(
+            self.rad, day, self.cube_dir, self.time_res, **self.kwargs
+        )
+        if (cube is None) or cube.partial():
+            return None
+        p = cube.echo_counts().values.astype(np.float32)
+        if not np.nansum(p) > 0:
+            p[:] = np.nan
+        return p
+
+    def update(self, date):
+        """
+        Add the missing daily profiles of the train_days days preceding
+        date to the cache
+        """
+        day, added = self._day(date), 0
+        for i in range(1, self.train_days + 1):
+            d = day - dt.timedelta(days=i)
+            if d not in self.profiles:
+                try:
+                    p = self._profile(d)
+                except Exception:
+                    p = None
+                if p is None:
+                    # Not cached, retried on the next update
+                    logger.warning(f"No profile {self.rad} on {d}")
+                    continue
+                self.profiles[d] = p
+                added += 1
+        if added > 0:
+            self._save()
+        return self
+
+    def fit(self, date):
+        """
+        Quiet-day median and MAD per UT bin for date, fitted once
+        """
+        day = self._day(date)
+        if day not in self._fits:
+            self.update(day)
+            days = [
+                day - dt.timedelta(days=i)
+                for i in range(1, self.train_days + 1)
+                if (day - dt.timedelta(days=i)) not in self.exclude
+            ]
+            missing = np.full(self.nbins, np.nan, dtype=np.float32)
+            x = np.array([self.profiles.get(d, missing) for d in days])
+            median = np.full(self.nbins, np.nan)
+            mad = np.full(self.nbins, np.nan)
+            valid = ~np.isnan(x).all(axis=0) if len(days) > 0 else None
+            if (valid is not None) and valid.any():
+                median[valid] = np.nanmedian(x[:, valid], axis=0)
+                # Scaled as scipy.stats.median_absolute_deviation
+                mad[valid] = 1.4826 * np.nanmedian(
+                    np.abs(x[:, valid] - median[valid]), axis=0
+                )
+            self._fits[day] = (median, mad)
+            if self.verbose:
+                logger.info(f"Climatology {self.rad} fitted for {day}")
+        return self._fits[day]
+
+    def _bin(self, time):
+        return int((time.hour * 3600 + time.minute * 60 + time.second) / self.time_res)
+
+    def baseline(self, time):
+        """
+        Quiet-day median echo count at time
+        """
+        return self.fit(time)[0][self._bin(time)]
+
+    def spread(self, time):
+        """
+        Quiet-day MAD of the echo count at time
+        """
+        return self.fit(time)[1][self._bin(time)]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+"""cubeUtils.py: utility module to bin radar-days into echo occurrence cubes."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import datetime as dt
+import json
+import os
+
+import h5py
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+
+class EchoCube(object):
+    """
+    Echo occurrence of one radar-day on a fixed (time bin x beam x gate)
+    grid: echo counts (valid v) and mean power (p_l) per cell, and the
+    number of soundings per (time bin x beam) telling a bin without
+    echoes from one without data
+    """
+
+    def __init__(
+        self,
+        rad,
+        date,
+        counts,
+        power,
+        soundings,
+        time_res=60,
+        start=0,
+        sources=[],
+    ):
+        """
+        rad: radar code
+        date: day of the cube
+        counts / power: (time bin x beam x gate) arrays
+        soundings: (time bin x beam) array of sounding counts
+        time_res: time bin (s)
+        start: index of the first time bin held (partial reads)
+        sources: source_stamps of the files the cube is binned from
+        """
+        self.rad = rad
+        self.date = dt.datetime(date.year, date.month, date.day)
+        self.counts = counts
+        self.power = power
+        self.soundings = soundings
+        self.time_res = time_res
+        self.sources = sources
+        self.times = pd.DatetimeIndex(
+            np.datetime64(self.date)
+            + (start + np.arange(counts.shape[0])) * np.timedelta64(time_res, "s")
+        )
+        return
+
+    @staticmethod
+    def from_frame(
+        frame, rad, date, nbeam, ngate, time_res=60, soundings=None, sources=[]
+    ):
+        """
+        Bin the echoes of a frame (time, bmnum, slist, v, p_l) of a day
+        soundings: record table (time, bmnum) including the records
+                   without gates (None: the soundings of the frame)
+        sources: source_stamps of the files the frame is read from
+        """
+        date = dt.datetime(date.year, date.month, date.day)
+        ntime = int(86400 / time_res)
+        size = ntime * nbeam * ngate
+        if soundings is None:
+            soundings = frame[["time", "bmnum"]].drop_duplicates()
+        t = soundings.time.values.astype("datetime64[ns]")
+        ti = (t - np.datetime64(date)) // np.timedelta64(time_res, "s")
+        bm = soundings.bmnum.values.astype(int)
+        keep = (ti >= 0) & (ti < ntime) & (bm >= 0) & (bm < nbeam)
+        nsound = np.bincount((ti * nbeam + bm)[keep], minlength=ntime * nbeam)
+        o = frame[frame.v.notnull()] if "v" in frame.columns else frame
+        t = o.time.values.astype("datetime64[ns]")
+        ti = (t - np.datetime64(date)) // np.timedelta64(time_res, "s")
+        bm, gate = o.bmnum.values.astype(int), o.slist.values.astype(int)
+        keep = (ti >= 0) & (ti < ntime) & (bm >= 0) & (bm < nbeam) & (gate < ngate)
+        idx = ((ti * nbeam + bm) * ngate + gate)[keep]
+        counts = np.bincount(idx, minlength=size)
+        power = np.full(size, np.nan, dtype=np.float32)
+        if "p_l" in o.columns:
+            p = o.p_l.values[keep].astype(float)
+            valid = ~np.isnan(p)
+            n = np.bincount(idx[valid], minlength=size)
+            psum = np.bincount(idx[valid], weights=p[valid], minlength=size)
+            power[n > 0] = psum[n > 0] / n[n > 0]
+        shape = (ntime, nbeam, ngate)
+        return EchoCube(
+            rad,
+            date,
+            counts.astype(np.uint16).reshape(shape),
+            power.reshape(shape),
+            nsound.astype(np.uint16).reshape(shape[:2]),
+            time_res,
+            sources=sources,
+        )
+
+    def _bins(self, date_range=None):
+        """
+        Slice of the time bins within date_range (None: all)
+        """
+        if date_range is None:
+            return slice(None)
+        i = self.times.searchsorted(pd.Timestamp(date_range[0]), "left")
+        j = self.times.searchsorted(pd.Timestamp(date_range[1]), "right")
+        return slice(i, j)
+
+    def echo_counts(self, date_range=None):
+        """
+        Echo counts per time bin summed over beams and gates, NaN for
+        the bins without soundings (no data)
+        """
+        b = self._bins(date_range)
+        o = self.counts[b].sum(axis=(1, 2)).astype(float)
+        o[~self.covered(date_range)] = np.nan
+        return pd.Series(o, index=self.times[b])
+
+    def covered(self, date_range=None):
+        """
+        Time bins holding at least one sounding
+        """
+        return self.soundings[self._bins(date_range)].sum(axis=1) > 0
+
+    def partial(self):
+        """
+        True if the day's data stops before its last hour, e.g. files
+        still arriving (or an outage running to the end of the day)
+        """
+        n = min(int(3600 / self.time_res), len(self.times))
+        return not self.covered()[-n:].any()
+
+    def rti(self, beam, param="counts", date_range=None):
+        """
+        Time bin x gate array of counts / power of one beam
+        """
+        return getattr(self, param)[self._bins(date_range), beam, :]
+
+    def fan(self, param="power", date_range=None):
+        """
+        Beam x gate array over the time bins within date_range, echo
+        counts summed and power averaged over the echoes
+        """
+        b = self._bins(date_range)
+        n = self.counts[b].sum(axis=0)
+        if param == "counts":
+            return n
+        w = self.counts[b] * np.nan_to_num(self.power[b])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, w.sum(axis=0) / n, np.nan)
+
+    def save(self, path):
+        """
+        Write the cube to HDF5, datasets chunked by hour of time bins
+        and compressed
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + f".{os.getpid()}.tmp"
+        chunks = (min(int(3600 / self.time_res), len(self.times)),) + tuple(
+            self.counts.shape[1:]
+        )
+        with h5py.File(tmp, "w") as f:
+            for name in ["counts", "power", "soundings"]:
+                data = getattr(self, name)
+                f.create_dataset(
+                    name,
+                    data=data,
+                    chunks=chunks[: data.ndim],
+                    compression="gzip",
+                    compression_opts=4,
+                    shuffle=True,
+                )
+            f.attrs["rad"] = self.rad
+            f.attrs["date"] = self.date.isoformat()
+            f.attrs["time_res"] = self.time_res
+            f.attrs["sources"] = json.dumps(self.sources)
+        os.replace(tmp, path)
+        return
+
+    @staticmethod
+    def load(path, date_range=None):
+        """
+        Read a cube from HDF5, only the chunks of the time bins within
+        date_range (None: all) are read
+        """
+        with h5py.File(path, "r") as f:
+            rad = f.attrs["rad"]
+            date = dt.datetime.fromisoformat(f.attrs["date"])
+            time_res = int(f.attrs["time_res"])
+            b = slice(None)
+            if date_range is not None:
+                t = (
+                    np.array(date_range, dtype="datetime64[s]") - np.datetime64(date)
+                ) / np.timedelta64(time_res, "s")
+                b = slice(max(int(np.ceil(t[0])), 0), max(int(np.floor(t[1])) + 1, 0))
+            counts, power = f["counts"][b], f["power"][b]
+            soundings = f["soundings"][b]
+            sources = json.loads(f.attrs["sources"])
+        return EchoCube(
+            rad, date, counts, power, soundings, time_res, b.start or 0, sources
+        )
+
+
+def source_stamps(files):
+    """
+    (path, size, mtime) of the source files of a cube, a cube binned
+    from files that have grown, changed or been added since is stale
+    """
+    stamps = []
+    for fname in sorted(files):
+        st = os.stat(fname)
+        stamps.append([os.path.abspath(fname), st.st_size, st.st_mtime_ns])
+    return stamps
+
+
+class CubeStore(object):
+    """
+    Folder of echo cubes, one HDF5 file per radar-day
+    """
+
+    def __init__(self, folder, verbose=False):
+        self.folder = folder
+        self.verbose = verbose
+        os.makedirs(self.folder, exist_ok=True)
+        return
+
+    def _get_path(self, rad, date):
+        return os.path.join(
+            self.folder, rad, f"{date.strftime('%Y%m%d')}.{rad}.cube.h5"
+        )
+
+    def get(self, rad, date, date_range=None, sources=None):
+        """
+        Cube of a radar-day, None on miss or if it was binned from other
+        versions of the source files than sources (None: not checked)
+        """
+        path = self._get_path(rad, date)
+        if os.path.exists(path):
+            try:
+                cube = EchoCube.load(path, date_range)
+            except Exception:
+                logger.warning(f"Unreadable cube {path}, dropping")
+                os.remove(path)
+                return None
+            if (sources is not None) and (cube.sources != sources):
+                if self.verbose:
+                    logger.info(f"Cube stale: {path}")
+                return None
+            if self.verbose:
+                logger.info(f"Cube hit: {path}")
+            return cube
+        return None
+
+    def put(self, cube):
+        """
+        Store the cube of a radar-day
+        """
+        path = self._get_path(cube.rad, cube.date)
+        cube.save(path)
+        if self.verbose:
+            logger.info(f"Cube stored: {path}")
+        return
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+"""detectUtils.py: utility module to detect SWF blackouts online from echo counts."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import numpy as np
+from loguru import logger
+
+# Echo levels relative to the quiet baseline, as in SDAnalysis.fetch_parameters
+ONSET_LEVEL = 0.9
+BLACKOUT_LEVEL = 0.5
+# SWF impact score descriptions, index is the score
+SWF_DESCRIPTIONS = ["Ineffective", "Detectable", "Moderate", "Severe"]
+# Radar states of config/events/*.json
+NORMAL, ONSET, BLACKOUT, RECOVERY = "N", "O", "B", "R"
+
+
+def swf_score(dmedian, median):
+    """
+    SWF impact score from the median echoes within the blackout
+    relative to the baseline median
+    """
+    if dmedian <= 0.25 * median:
+        return 3
+    elif 0.25 * median <= dmedian <= 0.5 * median:
+        return 2
+    elif 0.5 * median <= dmedian <= 0.75 * median:
+        return 1
+    return 0
+
+
+class SWFDetector(object):
+    """
+    Online SWF blackout detector of one radar. Consumes one (per scan)
+    echo count at a time and walks the N -> O -> B -> R -> N states
+    with the thresholds of SDAnalysis.fetch_parameters:
+        N -> O: echoes fall below ONSET_LEVEL x baseline
+        O -> B: echoes fall below BLACKOUT_LEVEL x baseline
+        O -> N: echoes back above ONSET_LEVEL x baseline (no blackout)
+        B -> R: echoes rise above BLACKOUT_LEVEL x baseline
+        R -> B: echoes fall below BLACKOUT_LEVEL x baseline again
+        R -> N: echoes back above ONSET_LEVEL x baseline
+    The baseline is the median of the first n_base counts, then an
+    exponential running mean of the counts seen in state N, or the
+    quiet-day median of a climatology (EchoClimatology) if given. Every
+    update is O(1), only the blackout counts are kept to score the
+    event once at its end. timings holds the event in progress and
+    events the completed ones (keys as in fetch_parameters).
+    """
+
+    def __init__(
+        self, rad=None, n_base=100, smooth_len=5, climatology=None, verbose=False
+    ):
+        """
+        rad: radar code, used in the log
+        n_base: number of counts to set up the baseline, no
+                transitions are emitted before it
+        smooth_len: span of the exponential smoothing of the counts
+                    (1: no smoothing)
+        climatology: Serves the baseline at each time (baseline(time)),
+                     no warm up is needed (None: running baseline)
+        """
+        self.rad = rad
+        self.n_base = n_base
+        self.alpha = 2.0 / (smooth_len + 1)
+        self.beta = 1.0 / n_base
+        self.climatology = climatology
+        self.verbose = verbose
+        self.state = NORMAL
+        self.baseline = None
+        self.echoes = None
+        self.last_time = None
+        self._warmup = []
+        self.events = []
+        self._reset_event()
+        return
+
+    def _reset_event(self):
+        self.timings = {}
+        self._peak = np.inf
+        self._blackout = []
+        return
+
+    def _transition(self, time, state):
+        """
+        Move to state and return the transition
+        """
+        tr = dict(
+            rad=self.rad,
+            time=time,
+            prev=self.state,
+            state=state,
+            echoes=self.echoes,
+            baseline=self.baseline,
+        )
+        self.state = state
+        if self.verbose:
+            logger.info(f"SWF {self.rad}: {tr['prev']} -> {state} at {time}")
+        return tr
+
+    def update(self, time, echoes):
+        """
+        Consume the echo count of one scan, returns the state
+        transitions (list of dict, in order, empty if none): a sharp
+        drop walks N -> O -> B within one update. A missing count
+        (None / NaN: no soundings, e.g. a radar outage) is skipped and
+        leaves the state as it is.
+        """
+        if (echoes is None) or np.isnan(echoes):
+            return []
+        self.echoes = (
+            echoes
+            if self.echoes is None
+            else self.echoes + self.alpha * (echoes - self.echoes)
+        )
+        prev_time, self.last_time = self.last_time, time
+        if self.climatology is not None:
+            self.baseline = self.climatology.baseline(time)
+            if not self.baseline > 0:
+                # No quiet-day echoes expected, nothing to detect
+                return []
+        elif self.baseline is None:
+            self._warmup.append(self.echoes)
+            if len(self._warmup) == self.n_base:
+                self.baseline, self._warmup = float(np.median(self._warmup)), []
+            return []
+        e, base, trs = self.echoes, self.baseline, []
+        if self.state == NORMAL:
+            if e < ONSET_LEVEL * base:
+                self._reset_event()
+                # Onset is the last count still at the quiet level
+                self.timings["onset"] = prev_time
+                trs.append(self._transition(time, ONSET))
+            elif self.climatology is None:
+                self.baseline += self.beta * (e - base)
+        if self.state == ONSET:
+            if e < BLACKOUT_LEVEL * base:
+                self.timings["start_blackout"] = time
+                trs.append(self._transition(time, BLACKOUT))
+            elif e >= ONSET_LEVEL * base:
+                trs.append(self._transition(time, NORMAL))
+        elif self.state == BLACKOUT:
+            if e > BLACKOUT_LEVEL * base:
+                self.timings["end_blackout"] = time
+                self._score()
+                trs.append(self._transition(time, RECOVERY))
+        elif self.state == RECOVERY:
+            if e < BLACKOUT_LEVEL * base:
+                trs.append(self._transition(time, BLACKOUT))
+            elif e >= ONSET_LEVEL * base:
+                self.timings["recovery"] = time
+                self.events.append(self.timings)
+                trs.append(self._transition(time, NORMAL))
+        if self.state == BLACKOUT:
+            self._blackout.append(e)
+            if e < self._peak:
+                self._peak, self.timings["peak_blackout"] = e, time
+        return trs
+
+    def _score(self):
+        """
+        Score the event from the counts within the blackout
+        """
+        score = swf_score(np.median(self._blackout), self.baseline)
+        self.timings.update(
+            median=self.baseline,
+            score=str(score),
+            description=SWF_DESCRIPTIONS[score],
+        )
+        return
+
+
+def replay(times, echoes, **kwargs):
+    """
+    Run a detector over a series of counts, returns the state after
+    every update (one character each, missing counts keep the state),
+    the transitions and the detector
+    """
+    det = SWFDetector(**kwargs)
+    states, transitions = [], []
+    for t, e in zip(times, echoes):
+        transitions.extend(det.update(t, e))
+        states.append(det.state)
+    return "".join(states), transitions, det
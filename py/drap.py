@@ -11,7 +11,6 @@ __maintainer__ = "Chakraborty, S."
 __email__ = "shibaji7@vt.edu"
 __status__ = "Research"
 
-import datetime as dt
 import os
 
 import cartopy
@@ -19,7 +18,7 @@ import matplotlib.pyplot as plt
 import mplstyle
 import numpy as np
 from goes import FlareTS
-from pysolar.solar import get_altitude
+from solarUtils import solar_zenith
 
 
 class DRAP(object):
@@ -49,31 +48,27 @@ class DRAP(object):
         lats = np.arange(-90, 90, 1)
         lons = np.arange(-180, 180, 2)
         lat_grd, lon_grd = np.meshgrid(lats, lons)
-        absp, drap_absp = (
-            np.zeros_like(lat_grd) * np.nan,
-            np.zeros_like(lat_grd) * np.nan,
+        # [i, j] is (lats[i], lons[j])
+        absp, drap_absp = self.calc_absorption(
+            lats[:, np.newaxis], lons[np.newaxis, :], date, F
         )
-        for i, lat in enumerate(lats):
-            for j, lon in enumerate(lons):
-                absp[i, j], drap_absp[i, j] = self.calc_absorption(lat, lon, date, F)
         self.draw_image(date, lat_grd, lon_grd, absp, drap_absp)
         return
 
     def calc_absorption(self, lat, lon, date, F):
-        ax, adrap = np.nan, np.nan
+        """
+        X-RAP / DRAP2 absorption at lat, lon (arrays broadcast), NaN
+        beyond SZA 105
+        """
         sza = self.get_solar(lat, lon, date)
-        if sza < 105.0:
-            COS = np.cos(np.deg2rad(sza)) if sza <= 90.0 else 0.0
-            ax = COS * F * 12080
-            HAF = (10 * np.log10(F) + 65) * (COS**0.75)
-            adrap = (HAF / 30) ** 1.5
+        COS = np.where(sza <= 90.0, np.cos(np.deg2rad(sza)), 0.0)
+        ax = np.where(sza < 105.0, COS * F * 12080, np.nan)
+        HAF = (10 * np.log10(F) + 65) * (COS**0.75)
+        adrap = np.where(sza < 105.0, (HAF / 30) ** 1.5, np.nan)
         return ax, adrap
 
     def get_solar(self, lat, lon, date):
-        date = date.to_pydatetime()
-        date = date.replace(tzinfo=dt.timezone.utc)
-        sza = float(90) - get_altitude(lat, lon, date)
-        return sza
+        return solar_zenith(date, lat, lon)
 
     def draw_image(self, date, lat_grd, lon_grd, absp, drap_absp):
         self.fig = (
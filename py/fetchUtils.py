@@ -11,44 +11,113 @@ __maintainer__ = "Chakraborty, S."
 __email__ = "shibaji7@vt.edu"
 __status__ = "Research"
 
-import bz2
+import copy
 import datetime as dt
 import glob
 import os
-
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 import mplstyle
 import numpy as np
 import pandas as pd
 import pydarn
+import pydarnio
+import bz2Utils
 import tidUtils
+from cacheUtils import FrameCache, LocalMirror
+from cubeUtils import CubeStore, EchoCube, source_stamps
 from dataUtils import Beam, Scan
+from detectUtils import BLACKOUT_LEVEL, ONSET_LEVEL, SWF_DESCRIPTIONS, swf_score, replay
+from geometryUtils import get_coords, get_hdw
+from indexUtils import FitacfIndex
+from smoothUtils import smooth
+from solarUtils import solar_zenith
+from tailUtils import FitacfTail
 from loguru import logger
 from scipy import stats
 
 
-def smooth(x, window_len=101, window="hanning"):
-    if x.ndim != 1:
-        raise ValueError("smooth only accepts 1 dimension arrays.")
-    if x.size < window_len:
-        raise ValueError("Input vector needs to be bigger than window size.")
-    if window_len < 3:
-        return x
-    if not window in ["flat", "hanning", "hamming", "bartlett", "blackman"]:
-        raise ValueError(
-            "Window is on of 'flat', 'hanning', 'hamming', 'bartlett', 'blackman'"
-        )
-    s = np.r_[x[window_len - 1 : 0 : -1], x, x[-2 : -window_len - 1 : -1]]
-    if window == "flat":
-        w = numpy.ones(window_len, "d")
-    else:
-        w = eval("np." + window + "(window_len)")
-    y = np.convolve(w / w.sum(), s, mode="valid")
-    d = window_len - 1
-    y = y[int(d / 2) : -int(d / 2)]
-    return y
+# Scalar (per beam) and vector (per gate) fitacf parameters
+S_PARAMS = [
+    "bmnum",
+    "noise.sky",
+    "tfreq",
+    "scan",
+    "nrang",
+    "intt.sc",
+    "intt.us",
+    "mppul",
+    "rsep",
+    "cp",
+    "frang",
+    "smsep",
+    "lagfr",
+    "channel",
+    "mplgs",
+    "nave",
+    "noise.search",
+    "mplgexs",
+    "xcf",
+    "noise.mean",
+    "ifmode",
+    "bmazm",
+    "rxrise",
+    "mpinc",
+]
+V_PARAMS = ["v", "w_l", "gflg", "p_l", "slist"]
+T_PARAMS = ["time.yr", "time.mo", "time.dy", "time.hr", "time.mt", "time.sc", "time.us"]
+# Always decoded: scan flag and beam for scan views, slist for gate counts
+BASE_PARAMS = ["scan", "bmnum", "slist"]
+# Derived columns and the raw parameters they are built from
+DERIVED_PARAMS = dict(
+    intt=["intt.sc", "intt.us"],
+    srange=["frang", "rsep", "slist"],
+)
+# Key of one beam sounding, files overlap at their boundaries so
+# repeated soundings are dropped at ingest (first one kept)
+DEDUP_KEYS = ["time", "bmnum", "channel"]
+# Compact frame storage: small ints for gate / beam / flag / count columns,
+# float32 for physical quantities and categoricals for repeated scalars
+COMPACT_DTYPES = {
+    "bmnum": "int8",
+    "scan": "int8",
+    "gflg": "int8",
+    "xcf": "int8",
+    "slist": "int16",
+    "nrang": "int16",
+    "mppul": "int16",
+    "mplgs": "int16",
+    "mplgexs": "int16",
+    "nave": "int16",
+    "tfreq": "int16",
+    "rsep": "int16",
+    "frang": "int16",
+    "smsep": "int16",
+    "lagfr": "int16",
+    "mpinc": "int16",
+    "rxrise": "int16",
+    "intt.sc": "int16",
+    "intt.us": "int32",
+    "scnum": "int32",
+    "scan_time": "float32",
+    "v": "float32",
+    "w_l": "float32",
+    "p_l": "float32",
+    "srange": "float32",
+    "intt": "float32",
+    "bmazm": "float32",
+    "glat": "float32",
+    "glon": "float32",
+    "noise.sky": "float32",
+    "noise.search": "float32",
+    "noise.mean": "float32",
+    "cp": "category",
+    "channel": "category",
+    "ifmode": "category",
+}
 
 
 def setup(science=True):
@@ -71,9 +140,400 @@ def setup(science=True):
     return
 
 
+def compact_frame(frame):
+    """
+    Downcast frame columns in place to COMPACT_DTYPES, column names are
+    unchanged. Integer columns holding NaN or out of range values are
+    stored as float32 instead.
+    """
+    for p, dtype in COMPACT_DTYPES.items():
+        if p not in frame.columns:
+            continue
+        x = frame[p]
+        if x.dtype == dtype:
+            continue
+        if (dtype != "category") and (np.dtype(dtype).kind == "i"):
+            info = np.iinfo(dtype)
+            fits = (len(x) == 0) or (
+                x.notna().all() and (x.min() >= info.min) and (x.max() <= info.max)
+            )
+            dtype = dtype if fits else "float32"
+        frame[p] = x.astype(dtype)
+    return frame
+
+
+def record_time(record):
+    """
+    Get datetime of a raw DMAP record (DmapScalar values)
+    """
+    return dt.datetime(
+        record["time.yr"].value,
+        record["time.mo"].value,
+        record["time.dy"].value,
+        record["time.hr"].value,
+        record["time.mt"].value,
+        record["time.sc"].value,
+        record["time.us"].value,
+    )
+
+
+def _first(mask):
+    """
+    Index of the first True of a mask, None if there is none
+    """
+    return int(np.argmax(mask)) if mask.any() else None
+
+
+def _last(mask):
+    """
+    Index of the last True of a mask, None if there is none
+    """
+    return len(mask) - 1 - int(np.argmax(mask[::-1])) if mask.any() else None
+
+
+def swf_timings(echoes, time):
+    """
+    SWF timings (onset, blackout start / peak / end, recovery) and
+    score of an echo count series in one vectorised pass: each
+    condition is a boolean mask over the series and each timing is
+    the first / last True of its mask. time is a list (timings are
+    its items) or datetime64 array / series (timings are Timestamps),
+    the latter skips the object conversion.
+    """
+    index = pd.DatetimeIndex(time)
+    if not isinstance(time, list):
+        time = index
+    echoes, t = np.asarray(echoes, dtype=float), index.values
+    timings, score = {}, 0
+    median = timings["median"] = np.median(echoes[:100])
+    timings["med"] = stats.median_absolute_deviation(echoes[:100])
+    if np.min(echoes) <= BLACKOUT_LEVEL * median:
+        peak = int(np.argmin(echoes))
+        timings["peak_blackout"] = time[peak]
+        before, after = t < t[peak], t > t[peak]
+        high = echoes >= ONSET_LEVEL * median
+        onset = _last(before & high)
+        if onset is not None:
+            timings["onset"] = time[onset]
+            start, end, recovery = (
+                _first(before & (echoes < BLACKOUT_LEVEL * median)),
+                -10,
+                -5,
+            )
+            if start is not None:
+                timings["start_blackout"] = time[start]
+                e = _first(after & (echoes > BLACKOUT_LEVEL * median))
+                if e is not None:
+                    end = e
+                    r = _first(after & high)
+                    recovery = r if r is not None else recovery
+            timings["end_blackout"], timings["recovery"] = time[end], time[recovery]
+            if start is not None:
+                window = (t >= t[start]) & (t <= t[end])
+                dmedian = np.median(echoes[window]) if window.any() else np.nan
+                score = swf_score(dmedian, median)
+    timings["score"] = str(score)
+    timings["description"] = SWF_DESCRIPTIONS[score]
+    return timings
+
+
+def mmap_reader(buf):
+    """
+    DMAP reader straight over a (memory-mapped) buffer. DmapRead copies
+    its input into a bytearray, so it is built on a stub and the buffer
+    is swapped in afterwards.
+    """
+    reader = pydarn.SuperDARNRead(b"\x00", True)
+    reader.dmap_bytearr, reader.dmap_buffer = buf, memoryview(buf)
+    reader.dmap_end_bytes = len(buf)
+    return reader
+
+
+def iter_fitacf_records(
+    fname, date_range=None, verbose=False, fields=None, mirror_dir=None, n_threads=1
+):
+    """
+    Generator over the decoded records of one fitacf<v> (.bz2) file.
+    Records before date_range[0] are dropped without conversion and
+    reading stops once a record passes date_range[1]. If fields is
+    given only those fields are converted. If mirror_dir is set the
+    file is decompressed once into the local mirror and read via mmap,
+    else it is decompressed block-parallel over n_threads.
+    """
+    if verbose:
+        logger.info(f"File:{fname}")
+    if mirror_dir is not None:
+        reader = mmap_reader(LocalMirror(mirror_dir, verbose=verbose).open(fname))
+    else:
+        fs = bz2Utils.read(fname, n_threads)
+        reader = pydarn.SuperDARNRead(fs, True)
+        del fs
+    while reader.cursor < reader.dmap_end_bytes:
+        record = reader.read_record()
+        if date_range is not None:
+            time = record_time(record)
+            if time < date_range[0]:
+                continue
+            if time > date_range[1]:
+                break
+        if fields is None:
+            yield pydarnio.dmap2dict([record])[0]
+        else:
+            yield dict((k, record[k].value) for k in fields if k in record)
+    return
+
+
+def read_fitacf_file(
+    fname, verbose=False, date_range=None, fields=None, mirror_dir=None, n_threads=1
+):
+    """
+    Decode one fitacf<v> (.bz2) file into a list of records.
+    Kept at module level so it can be shipped to pool workers.
+    """
+    return list(
+        iter_fitacf_records(fname, date_range, verbose, fields, mirror_dir, n_threads)
+    )
+
+
+def scan_boundaries(time, scan):
+    """
+    Vectorised scan segmentation over record-level arrays, a new scan
+    starts where the scan flag is set and time moves on from the
+    previous record. Returns scan id of each record, index of the
+    first record, start / end time and duration (s) of each scan.
+    """
+    t = np.asarray(time, dtype="datetime64[ns]").view("i8")
+    new = np.zeros(len(t), dtype=bool)
+    new[1:] = (np.asarray(scan)[1:] == 1) & (np.diff(t) != 0)
+    scnum = np.cumsum(new)
+    starts = np.flatnonzero(new)
+    starts = np.r_[0, starts] if len(t) > 0 else starts
+    stime = np.minimum.reduceat(t, starts) if len(t) > 0 else t
+    etime = np.maximum.reduceat(t, starts) if len(t) > 0 else t
+    scan_time = 60 * np.rint((etime - stime) * 1e-9 / 60.0)
+    return (
+        scnum,
+        starts,
+        stime.view("datetime64[ns]"),
+        etime.view("datetime64[ns]"),
+        scan_time,
+    )
+
+
+def records_to_columns(records, s_params, v_params):
+    """
+    Convert decoded records into one columnar block
+    recs: one row per record (time, scalar params, ngates)
+    gates: one row per range gate (vector params)
+    """
+    _t = dict(zip(T_PARAMS, ([] for _ in T_PARAMS)))
+    _s = dict(zip(s_params, ([] for _ in s_params)))
+    _v = dict(zip(v_params, ([] for _ in v_params)))
+    ngates = []
+    for d in records:
+        for p in _t.keys():
+            _t[p].append(d[p])
+        n = len(d["slist"]) if "slist" in d else 0
+        ngates.append(n)
+        for p in s_params:
+            _s[p].append(d.get(p, np.nan))
+        if n > 0:
+            for p in v_params:
+                _v[p].append(d[p] if p in d else np.full(n, np.nan))
+    recs = pd.DataFrame(_s)
+    recs["time"] = pd.to_datetime(
+        dict(
+            year=_t["time.yr"],
+            month=_t["time.mo"],
+            day=_t["time.dy"],
+            hour=_t["time.hr"],
+            minute=_t["time.mt"],
+            second=_t["time.sc"],
+            microsecond=_t["time.us"],
+        )
+    )
+    recs["ngates"] = np.asarray(ngates, dtype=int)
+    if "scan" in recs.columns:
+        recs["scan"] = (recs.scan != 0).astype(int)
+    if ("intt.sc" in recs.columns) and ("intt.us" in recs.columns):
+        recs["intt"] = recs["intt.sc"] + 1.0e-6 * recs["intt.us"]
+    gates = pd.DataFrame(
+        dict(
+            (p, np.concatenate(_v[p]) if len(_v[p]) > 0 else np.array([]))
+            for p in v_params
+        )
+    )
+    return recs, gates
+
+
+def read_fitacf_columns(
+    fname,
+    s_params,
+    v_params,
+    verbose=False,
+    date_range=None,
+    mirror_dir=None,
+    n_threads=1,
+):
+    """
+    Decode one fitacf<v> (.bz2) file straight into a columnar block.
+    Kept at module level so it can be shipped to pool workers.
+    """
+    fields = T_PARAMS + s_params + v_params
+    return records_to_columns(
+        iter_fitacf_records(fname, date_range, verbose, fields, mirror_dir, n_threads),
+        s_params,
+        v_params,
+    )
+
+
+def sounding_key(d):
+    """
+    Hashable DEDUP_KEYS of a decoded record: time fields, bmnum, channel
+    """
+    return tuple(d[p] for p in T_PARAMS) + (d.get("bmnum", 0), d.get("channel", 0))
+
+
+def dedup_records(records, seen=None):
+    """
+    Drop records of soundings already seen, hash index on DEDUP_KEYS.
+    Pass seen to carry the index over several calls.
+    """
+    seen = set() if seen is None else seen
+    for d in records:
+        key = sounding_key(d)
+        if key not in seen:
+            seen.add(key)
+            yield d
+    return
+
+
+def stream_echo_counts(
+    fname, date_range=None, verbose=False, mirror_dir=None, n_threads=1
+):
+    """
+    Echo (valid v) counts per sounding (sounding_key) of one file
+    accumulated while the records are decoded, so no per-gate frame
+    is built. Records without gates are skipped as they have no rows
+    in a frame. Kept at module level for pool workers.
+    """
+    counts = {}
+    fields = T_PARAMS + ["bmnum", "channel", "slist", "v"]
+    for d in iter_fitacf_records(
+        fname, date_range, verbose, fields, mirror_dir, n_threads
+    ):
+        if len(d.get("slist", [])) == 0:
+            continue
+        n = np.count_nonzero(~np.isnan(d["v"])) if "v" in d else 0
+        # Repeated soundings are counted once
+        counts.setdefault(sounding_key(d), int(n))
+    return counts
+
+
+def echo_counts_to_pandas(counts, by_beam=False):
+    """
+    Convert per-sounding echo counts into a dataframe (time, [bmnum,] v)
+    sorted by time, v holds the echo counts as in groupby("time").count()
+    """
+    cols = ["time"] + (["bmnum"] if by_beam else []) + ["v"]
+    if len(counts) == 0:
+        return pd.DataFrame(columns=cols)
+    keys = np.array(list(counts.keys()), dtype=np.int64)
+    o = pd.DataFrame()
+    o["time"] = pd.to_datetime(
+        dict(
+            (u, keys[:, i])
+            for i, u in enumerate(
+                ["year", "month", "day", "hour", "minute", "second", "microsecond"]
+            )
+        )
+    )
+    o["bmnum"] = keys[:, len(T_PARAMS)]
+    o["v"] = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    return o.groupby(cols[:-1]).v.sum().reset_index()
+
+
+def mask_block(block, mask):
+    """
+    Slice a columnar block to the records in mask with their gates
+    """
+    recs, gates = block
+    gmask = np.repeat(mask, recs.ngates.values)
+    return recs[mask].reset_index(drop=True), gates[gmask].reset_index(drop=True)
+
+
+def filter_block(block, date_range):
+    """
+    Slice a columnar block to the records within date_range
+    """
+    recs = block[0]
+    return mask_block(
+        block, ((recs.time >= date_range[0]) & (recs.time <= date_range[1])).values
+    )
+
+
+def dedup_block(block):
+    """
+    Drop repeated soundings (same DEDUP_KEYS) from a columnar block
+    with a hashed duplicated() over the record table, first one kept
+    """
+    keep = ~block[0].duplicated(subset=DEDUP_KEYS).values
+    return block if keep.all() else mask_block(block, keep)
+
+
+def load_fitacf_columns(
+    fname,
+    s_params,
+    v_params,
+    verbose=False,
+    date_range=None,
+    cache_dir=None,
+    mirror_dir=None,
+    n_threads=1,
+):
+    """
+    Columnar block of one file, read through the on-disk cache if
+    cache_dir is set. The cache holds whole files, so the time
+    window is applied after the read.
+    """
+    if cache_dir is None:
+        return read_fitacf_columns(
+            fname, s_params, v_params, verbose, date_range, mirror_dir, n_threads
+        )
+    cache = FrameCache(cache_dir, verbose=verbose)
+    block = cache.get(fname)
+    if (block is not None) and not (
+        set(s_params).issubset(block[0].columns)
+        and set(v_params).issubset(block[1].columns)
+    ):
+        block = None
+    if block is None:
+        # Whole parameter set is cached so it serves any projection
+        block = read_fitacf_columns(
+            fname,
+            S_PARAMS + [p for p in s_params if p not in S_PARAMS],
+            V_PARAMS + [p for p in v_params if p not in V_PARAMS],
+            verbose,
+            mirror_dir=mirror_dir,
+            n_threads=n_threads,
+        )
+        cache.put(fname, block)
+    recs, gates = block
+    keep = set(s_params) | set(["time", "ngates"])
+    if ("intt.sc" in keep) and ("intt.us" in keep):
+        keep.add("intt")
+    block = (recs[[c for c in recs.columns if c in keep]], gates[v_params])
+    if date_range is not None:
+        block = filter_block(block, date_range)
+    return block
+
+
 class FetchData(object):
     """Class to fetch data from fitacf files for one radar for atleast a day"""
 
+    # File name pattern of the fitacf<v> archive
+    regex = "/sd-data/{year}/{ftype}/{rad}/{date}.*.{ftype}.bz2"
+
     def __init__(
         self,
         rad,
@@ -81,12 +541,28 @@ class FetchData(object):
         ftype="fitacf",
         files=None,
         verbose=True,
+        n_procs=1,
+        cache_dir=None,
+        index_db=None,
+        columns=None,
+        geolocate=False,
+        compact=False,
+        mirror_dir=None,
     ):
         """
         initialize the vars
         rad = radar code
         date_range = [ start_date, end_date ]
         files = List of files to load the data from
+        n_procs = Number of worker processes to decode files (1: serial)
+        cache_dir = Folder of the decoded-frame cache (None: no caching)
+        index_db = SQLite index of archive files (None: glob the archive)
+        columns = Columns needed by the caller (None: all), others are
+                  never converted or materialised
+        geolocate = Add geographic glat / glon of every echo to the frame
+        compact = Store frame columns as small ints / float32 / categoricals
+        mirror_dir = Folder of the decompressed local mirror, read via mmap
+                     (None: decompress on every read)
         e.x :   rad = "sas"
                 date_range = [
                     datetime.datetime(2017,3,17),
@@ -97,39 +573,55 @@ class FetchData(object):
         self.date_range = date_range
         self.files = files
         self.verbose = verbose
-        self.regex = "/sd-data/{year}/{ftype}/{rad}/{date}.*.{ftype}.bz2"
+        self.n_procs = n_procs
+        self.cache_dir = cache_dir
+        self.index_db = index_db
         self.ftype = ftype
         if (rad is not None) and (date_range is not None) and (len(date_range) == 2):
             self._create_files()
-        self.s_params = [
-            "bmnum",
-            "noise.sky",
-            "tfreq",
-            "scan",
-            "nrang",
-            "intt.sc",
-            "intt.us",
-            "mppul",
-            "rsep",
-            "cp",
-            "frang",
-            "smsep",
-            "lagfr",
-            "channel",
-            "mplgs",
-            "nave",
-            "noise.search",
-            "mplgexs",
-            "xcf",
-            "noise.mean",
-            "ifmode",
-            "bmazm",
-            "rxrise",
-            "mpinc",
-        ]
-        self.v_params = ["v", "w_l", "gflg", "p_l", "slist"]
-        self.hdw_data = pydarn.read_hdw_file(self.rad)
-        self.lats, self.lons = pydarn.Coords.GEOGRAPHIC(self.hdw_data.stid)
+        self.s_params = list(S_PARAMS)
+        self.v_params = list(V_PARAMS)
+        self.columns = columns
+        self.geolocate = geolocate
+        self.compact = compact
+        self.mirror_dir = mirror_dir
+        if columns is not None:
+            self._project(columns)
+        self._scans = None
+        self.hdw_data = get_hdw(self.rad)
+        coords = get_coords(self.rad, cache_dir)
+        self.lats, self.lons = coords["lats"], coords["lons"]
+        return
+
+    def _project(self, columns):
+        """
+        Restrict s_params / v_params to the requested columns
+        """
+        need = set(columns) | set(BASE_PARAMS)
+        for c in columns:
+            need |= set(DERIVED_PARAMS.get(c, []))
+        self.s_params = [p for p in self.s_params if p in need]
+        self.v_params = [p for p in self.v_params if p in need]
+        return
+
+    def _wants(self, p):
+        """
+        Check if a derived column is requested
+        """
+        return (self.columns is None) or (p in self.columns)
+
+    @property
+    def scans(self):
+        """
+        Scan objects are lazy views, built from the frame on first access
+        """
+        if (self._scans is None) and hasattr(self, "frame"):
+            self._scans = self.pandas_to_scans(self.frame)
+        return self._scans
+
+    @scans.setter
+    def scans(self, scans):
+        self._scans = scans
         return
 
     def _create_files(self):
@@ -138,6 +630,9 @@ class FetchData(object):
         """
         if self.files is None:
             self.files = []
+        if self.index_db is not None:
+            self._create_files_from_index()
+            return
         reg_ex = self.regex
         days = (self.date_range[1] - self.date_range[0]).days + 2
         ent = -1
@@ -168,10 +663,33 @@ class FetchData(object):
                     ent = -1
         return
 
+    def _create_files_from_index(self):
+        """
+        Get overlapping file names from the SQLite index
+        """
+        index = FitacfIndex(
+            self.index_db, root=self.regex.split("{year}")[0], verbose=self.verbose
+        )
+        years = sorted(
+            set(
+                [
+                    (self.date_range[0] - dt.timedelta(days=1)).year,
+                    (self.date_range[1] + dt.timedelta(days=1)).year,
+                ]
+            )
+        )
+        index.update(
+            years=list(range(years[0], years[-1] + 1)),
+            ftypes=[self.ftype],
+            rads=[self.rad],
+        )
+        self.files.extend(index.query(self.rad, self.date_range, self.ftype))
+        return
+
     def _parse_data(self, data, s_params, v_params, by):
         """
         Parse data by data type
-        data: list of data dict
+        data: list / iterator of data dict
         params: parameter list to fetch
         by: sort data by beam or scan
         """
@@ -194,21 +712,23 @@ class FetchData(object):
                 _b.append(bm)
         if self.verbose:
             logger.info("Converted to beam data.")
+        if len(_b) == 0:
+            return _b, _s, False
         if by == "scan":
             if self.verbose:
                 logger.info("Started converting to scan data.")
-            scan, sc = 0, Scan(None, None)
-            sc.beams.append(_b[0])
-            for _ix, d in enumerate(_b[1:]):
-                if d.scan == 1 and d.time != _b[_ix].time:
-                    sc.update_time()
-                    _s.append(sc)
-                    sc = Scan(None, None)
-                    sc.beams.append(d)
-                else:
-                    sc.beams.append(d)
-            sc.update_time()
-            _s.append(sc)
+            _, starts, stime, etime, scan_time = scan_boundaries(
+                [b.time for b in _b], [b.scan for b in _b]
+            )
+            stime, etime = pd.to_datetime(stime), pd.to_datetime(etime)
+            ends = np.r_[starts[1:], len(_b)]
+            for i, (a, e) in enumerate(zip(starts, ends)):
+                sc = Scan(stime[i].to_pydatetime(), etime[i].to_pydatetime())
+                sc.beams = _b[a:e]
+                sc.scan_time = scan_time[i]
+                for b in sc.beams:
+                    b.scan_time = scan_time[i]
+                _s.append(sc)
             if self.verbose:
                 logger.info("Converted to scan data.")
         return _b, _s, True
@@ -278,17 +798,47 @@ class FetchData(object):
                     _o[p].extend([np.nan] * (L - l))
         return pd.DataFrame.from_records(_o)
 
-    def __get_location__(self, row):
+    def _geolocate(self, frame):
         """
-        Get locations
+        Add geographic lat / lon of every echo with one fancy-index
+        into the FoV arrays on (slist, bmnum)
         """
-        lat, lon, dtime = (
-            self.lats[row["slist"], row["bmnum"]],
-            self.lons[row["slist"], row["bmnum"]],
-            row["time"],
-        )
-        row["glat"], row["glon"] = lat, lon
-        return row
+        g, b = frame.slist.values.astype(int), frame.bmnum.values.astype(int)
+        ok = (g >= 0) & (g < self.lats.shape[0]) & (b >= 0) & (b < self.lats.shape[1])
+        glat, glon = np.full(len(frame), np.nan), np.full(len(frame), np.nan)
+        glat[ok], glon[ok] = self.lats[g[ok], b[ok]], self.lons[g[ok], b[ok]]
+        frame["glat"], frame["glon"] = glat, glon
+        return frame
+
+    def _split_frame(self, df, by):
+        """
+        Sort the frame once (stable) by the `by` columns and return the
+        column arrays with [start, end) row bounds of each group. Rows
+        of a group are contiguous so groups are zero-copy slices.
+        """
+        cols = dict((c, df[c].values) for c in df.columns)
+        keys = [cols[k] for k in by]
+        idx = np.lexsort(keys[::-1])
+        if np.any(idx[1:] < idx[:-1]):
+            cols = dict((c, v[idx]) for c, v in cols.items())
+            keys = [cols[k] for k in by]
+        change = np.zeros(max(len(idx) - 1, 0), dtype=bool)
+        for k in keys:
+            change |= k[1:] != k[:-1]
+        starts = np.r_[0, np.flatnonzero(change) + 1] if len(idx) > 0 else idx
+        ends = np.r_[starts[1:], len(idx)] if len(idx) > 0 else idx
+        return cols, starts, ends
+
+    def _beam_from_slice(self, cols, a, e):
+        """
+        Create one beam from rows [a, e) of the column arrays
+        """
+        d = dict((p, cols[p][a]) for p in self.s_params if p in cols)
+        d.update((p, cols[p][a:e]) for p in self.v_params if p in cols)
+        d["time"] = pd.Timestamp(cols["time"][a])
+        b = Beam()
+        b.set(d["time"], d, self.s_params, self.v_params)
+        return b
 
     def pandas_to_beams(
         self,
@@ -299,16 +849,10 @@ class FetchData(object):
         """
         if "time" not in self.s_params:
             self.s_params.append("time")
-        beams = []
-        for bm in np.unique(df.bmnum):
-            o = df[df.bmnum == bm]
-            d = o.to_dict(orient="list")
-            for p in self.s_params:
-                d[p] = d[p][0]
-            b = Beam()
-            b.set(o.time.tolist()[0], d, self.s_params, self.v_params)
-            beams.append(b)
-        return beams
+        if len(df) == 0:
+            return []
+        cols, starts, ends = self._split_frame(df, ["bmnum"])
+        return [self._beam_from_slice(cols, a, e) for a, e in zip(starts, ends)]
 
     def pandas_to_scans(
         self,
@@ -320,11 +864,20 @@ class FetchData(object):
         if "time" not in self.s_params:
             self.s_params.append("time")
         scans = []
-        for sn in np.unique(df.scnum):
-            o = df[df.scnum == sn]
-            beams = self.pandas_to_beams(o)
+        if len(df) == 0:
+            return scans
+        cols, starts, ends = self._split_frame(df, ["scnum", "bmnum"])
+        scnum = cols["scnum"][starts]
+        # Beam groups where a new scan begins
+        bounds = np.r_[0, np.flatnonzero(scnum[1:] != scnum[:-1]) + 1, len(starts)]
+        for i, j in zip(bounds[:-1], bounds[1:]):
             sc = Scan(None, None)
-            sc.beams.extend(beams)
+            sc.beams.extend(
+                [
+                    self._beam_from_slice(cols, a, e)
+                    for a, e in zip(starts[i:j], ends[i:j])
+                ]
+            )
             sc.update_time()
             scans.append(sc)
         return scans
@@ -338,20 +891,298 @@ class FetchData(object):
         params: parameter list to fetch
         by: sort data by beam or scan
         """
-        data = []
+        if by is not None:
+            _b, _s, ok = self._parse_data(
+                self._iter_records(), self.s_params, self.v_params, by
+            )
+            if ok:
+                return _b, _s, ok
+        return (None, None, False)
+
+    def _bz2_threads(self):
+        """
+        Threads per file for block-parallel bz2: the n_procs budget left
+        once the files are spread over worker processes, so a single
+        file (one radar-day) still uses all of it
+        """
+        workers = min(self.n_procs, len(self.files)) if len(self.files) > 1 else 1
+        return max(1, self.n_procs // max(1, workers))
+
+    def _iter_records(self):
+        """
+        Yield in-window records file by file, so only one
+        decoded file is held in memory at a time.
+        """
+        fields = T_PARAMS + self.s_params + self.v_params + ["channel"]
+        seen = set()
+        if (self.n_procs > 1) and (len(self.files) > 1):
+            # Files are decoded in parallel, pool.map keeps file order
+            # hence records stay in chronological order.
+            n, L = min(self.n_procs, len(self.files)), len(self.files)
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                for records in pool.map(
+                    read_fitacf_file,
+                    self.files,
+                    [self.verbose] * L,
+                    [self.date_range] * L,
+                    [fields] * L,
+                    [self.mirror_dir] * L,
+                    [self._bz2_threads()] * L,
+                ):
+                    yield from dedup_records(records, seen)
+        else:
+            for f in self.files:
+                yield from dedup_records(
+                    iter_fitacf_records(
+                        f,
+                        self.date_range,
+                        self.verbose,
+                        fields,
+                        self.mirror_dir,
+                        self._bz2_threads(),
+                    ),
+                    seen,
+                )
+        return
+
+    def _iter_blocks(self, s_params, v_params):
+        """
+        Yield columnar blocks (recs, gates) file by file.
+        """
+        if (self.n_procs > 1) and (len(self.files) > 1):
+            n, L = min(self.n_procs, len(self.files)), len(self.files)
+            with ProcessPoolExecutor(max_workers=n) as pool:
+                yield from pool.map(
+                    load_fitacf_columns,
+                    self.files,
+                    [s_params] * L,
+                    [v_params] * L,
+                    [self.verbose] * L,
+                    [self.date_range] * L,
+                    [self.cache_dir] * L,
+                    [self.mirror_dir] * L,
+                    [self._bz2_threads()] * L,
+                )
+        else:
+            for f in self.files:
+                yield load_fitacf_columns(
+                    f,
+                    s_params,
+                    v_params,
+                    self.verbose,
+                    self.date_range,
+                    self.cache_dir,
+                    self.mirror_dir,
+                    self._bz2_threads(),
+                )
+        return
+
+    def fetch_echo_counts(self, by_beam=False):
+        """
+        Streaming aggregation: echo counts per timestamp (and beam if
+        by_beam) accumulated file by file during decode, memory does
+        not grow with the number of echoes in the window
+        """
+        counts, L = {}, len(self.files)
+
+        def merge(parts):
+            for part in parts:
+                for k, n in part.items():
+                    # Soundings repeated across files are counted once
+                    counts.setdefault(k, n)
+            return
+
+        if (self.n_procs > 1) and (L > 1):
+            with ProcessPoolExecutor(max_workers=min(self.n_procs, L)) as pool:
+                merge(
+                    pool.map(
+                        stream_echo_counts,
+                        self.files,
+                        [self.date_range] * L,
+                        [self.verbose] * L,
+                        [self.mirror_dir] * L,
+                        [self._bz2_threads()] * L,
+                    )
+                )
+        else:
+            merge(
+                stream_echo_counts(
+                    f,
+                    self.date_range,
+                    self.verbose,
+                    self.mirror_dir,
+                    self._bz2_threads(),
+                )
+                for f in self.files
+            )
+        return echo_counts_to_pandas(counts, by_beam)
+
+    def _build_frame(self, recs, gates, start_scnum=0):
+        """
+        Build the dataframe in one pass: record-level scalars are
+        broadcast by gate count (np.repeat) next to gate-level vectors
+        """
+        recs = recs.reset_index(drop=True)
+        scnum, _, _, _, scan_time = scan_boundaries(recs.time.values, recs.scan.values)
+        recs["scnum"], recs["scan_time"] = scnum + start_scnum, scan_time[scnum]
+        counts = recs.ngates.values
+        _o = {}
+        for p in recs.columns.drop("ngates"):
+            _o[p] = np.repeat(recs[p].values, counts)
+        for p in gates.columns:
+            _o[p] = gates[p].values
+        if "srange" in self.v_params:
+            _o["srange"] = _o["frang"] + _o["slist"] * _o["rsep"]
+        return pd.DataFrame(_o)
+
+    def _frame_params(self):
+        """
+        Register derived columns and return the raw (s_params, v_params)
+        to decode for a frame
+        """
+        if "time" not in self.s_params:
+            self.s_params.append("time")
+        if self._wants("intt") and ("intt" not in self.s_params):
+            self.s_params.append("intt")
+        if self._wants("srange") and ("srange" not in self.v_params):
+            self.v_params.append("srange")
+        s_params = [p for p in self.s_params if p not in ["time", "intt"]]
+        v_params = [p for p in self.v_params if p != "srange"]
+        return s_params, v_params
+
+    def _blocks_to_frame(self, recs, gates, start_scnum=0):
+        """
+        Build the frame of a columnar block with the optional
+        geolocation and compact dtypes
+        """
+        if self.compact:
+            # Downcast before the gate-level broadcast to keep peak memory low
+            recs, gates = compact_frame(recs), compact_frame(gates)
+        frame = self._build_frame(recs, gates, start_scnum)
+        if self.geolocate:
+            frame = self._geolocate(frame)
+        if self.compact:
+            frame = compact_frame(frame)
+        return frame
+
+    def fetch_frame(self):
+        """
+        Fetch data from file list straight into a columnar dataframe,
+        no Beam/Scan objects are created on the way. The record table
+        (time, bmnum) of all soundings, including those without gates,
+        is kept in self.soundings.
+        """
+        s_params, v_params = self._frame_params()
+        keys = [p for p in DEDUP_KEYS if p not in s_params + ["time"]]
+        blocks = list(self._iter_blocks(s_params + keys, v_params))
+        if (len(blocks) == 0) or (sum(len(b[0]) for b in blocks) == 0):
+            return None
+        recs, gates = dedup_block(
+            (
+                pd.concat([b[0] for b in blocks], ignore_index=True),
+                pd.concat([b[1] for b in blocks], ignore_index=True),
+            )
+        )
+        self.soundings = recs[["time", "bmnum"]].reset_index(drop=True)
+        return self._blocks_to_frame(recs.drop(columns=keys), gates)
+
+    def poll(self, date_range=None):
+        """
+        Follow mode: decode only the records appended to the files since
+        the last poll and append them to self.frame. The byte offset into
+        every file is remembered, so a poll costs time proportional to
+        the new data. Passing date_range moves the window and re-lists
+        the files, picking up newly created ones, and drops the rows,
+        seen soundings and file offsets that fell out of it. The first
+        poll reads the files from the start and replaces self.frame
+        (e.g. one built by fetch) instead of appending to it. Returns
+        the number of new records.
+        """
+        first = not hasattr(self, "_tails")
+        if first:
+            self._tails, self._seen = {}, set()
+        if date_range is not None:
+            self.date_range, self.files = date_range, None
+            self._create_files()
+            self._trim_window()
+        s_params, v_params = self._frame_params()
+        fields = T_PARAMS + s_params + v_params + ["channel"]
+        records = []
         for f in self.files:
-            with bz2.open(f) as fp:
-                fs = fp.read()
-            if self.verbose:
-                logger.info(f"File:{f}")
-            reader = pydarn.SuperDARNRead(fs, True)
-            records = reader.read_fitacf()
-            data += records
-        if (by is not None) and (len(data) > 0):
-            data = self._parse_data(data, self.s_params, self.v_params, by)
-            return data
+            if f not in self._tails:
+                self._tails[f] = FitacfTail(f, self.verbose)
+            records.extend(dedup_records(self._tails[f].read(fields), self._seen))
+        recs, gates = filter_block(
+            records_to_columns(records, s_params, v_params), self.date_range
+        )
+        if len(recs) == 0:
+            return 0
+        frame = None if first else getattr(self, "frame", None)
+        if (frame is None) or (len(frame) == 0):
+            self.frame = self._blocks_to_frame(recs, gates)
         else:
-            return (None, None, False)
+            last = int(frame.scnum.values[-1])
+            # Records without the scan flag continue the last scan
+            start = last if recs.scan.values[0] != 1 else last + 1
+            frame = pd.concat(
+                [frame, self._blocks_to_frame(recs, gates, start)], ignore_index=True
+            )
+            if start == last:
+                # Scan cut by the poll boundary, refresh its duration
+                a, e = np.searchsorted(frame.scnum.values, [last, last + 1])
+                t = frame.time.values[a:e]
+                frame.iloc[a:e, frame.columns.get_loc("scan_time")] = 60 * np.rint(
+                    (t.max() - t.min()) / np.timedelta64(60, "s")
+                )
+            # Categories of the new rows may differ, re-categorise
+            self.frame = compact_frame(frame) if self.compact else frame
+        self._scans = None
+        return len(recs)
+
+    def _trim_window(self):
+        """
+        Follow mode: forget what is older than self.date_range, so a
+        long running poll loop holds only the current window
+        """
+        self._tails = dict(
+            (f, tail) for f, tail in self._tails.items() if f in self.files
+        )
+        start = self.date_range[0]
+        # sounding_key starts with the T_PARAMS fields, compared in order
+        t0 = (
+            start.year,
+            start.month,
+            start.day,
+            start.hour,
+            start.minute,
+            start.second,
+            start.microsecond,
+        )
+        self._seen = set(k for k in self._seen if k[: len(t0)] >= t0)
+        frame = getattr(self, "frame", None)
+        if (frame is not None) and (len(frame) > 0):
+            i = np.searchsorted(frame.time.values, np.datetime64(start), "left")
+            if i > 0:
+                self.frame = frame.iloc[i:].reset_index(drop=True)
+                self._scans = None
+        return
+
+    def time_slice(self, date_range):
+        """
+        This radar's data over a sub-range: a shallow copy whose frame /
+        echoes are row slices of the (time sorted) originals, so the
+        columns are shared, not copied
+        """
+        fd = copy.copy(self)
+        fd.date_range, fd._scans = date_range, None
+        for name in ["frame", "echoes"]:
+            if hasattr(self, name):
+                df = getattr(self, name)
+                t = df.time.values
+                i = np.searchsorted(t, np.datetime64(date_range[0]), "left")
+                j = np.searchsorted(t, np.datetime64(date_range[1]), "right")
+                setattr(fd, name, df.iloc[i:j])
+        return fd
 
     def plot_RTI(self, beams=[], nGates=100, date_range=None, angle_th=100.0, vhm=None):
         """
@@ -433,21 +1264,147 @@ class FetchData(object):
         ftype="fitacf",
         files=None,
         verbose=False,
+        n_procs=1,
+        cache_dir=None,
+        index_db=None,
+        columns=None,
+        geolocate=False,
+        compact=False,
+        mirror_dir=None,
+        stream=False,
     ):
         """
         Static method to fetch datasets
+        stream = Only accumulate echo counts per timestamp (fd.echoes),
+                 no frame is built
         """
-        fd = FetchData(rad, date_range, ftype, files, verbose)
-        _, scans, data_exists = fd.fetch_data(by="scan")
-        if data_exists:
-            fd.frame = fd.scans_to_pandas(scans)
-            fd.scans = scans
+        fd = FetchData(
+            rad,
+            date_range,
+            ftype,
+            files,
+            verbose,
+            n_procs,
+            cache_dir,
+            index_db,
+            columns,
+            geolocate,
+            compact,
+            mirror_dir,
+        )
+        if stream:
+            fd.echoes = fd.fetch_echo_counts()
+            if verbose:
+                logger.info(f"Echo counts {rad}: {len(fd.echoes)}")
+            return fd
+        frame = fd.fetch_frame()
+        if frame is not None:
+            fd.frame = frame
             if verbose:
                 logger.info(f"Data length {rad}: {len(fd.frame)}")
-        #             if len(fd.frame) > 0:
-        #                 fd.frame = fd.frame.apply(fd.__get_location__, axis=1)
         return fd
 
+    @staticmethod
+    def fetch_echo_cube(
+        rad, date, cube_dir=None, time_res=60, date_range=None, **kwargs
+    ):
+        """
+        Echo occurrence cube (time bin x beam x gate) of a radar-day, read
+        from cube_dir if present and binned from the current version of
+        the day's files, else binned from the day's frame and stored
+        there (None: not stored). None if the day has no data
+        date_range = Time bins to read back (None: the whole day)
+        kwargs = FetchData.fetch options (n_procs, cache_dir, ...)
+        """
+        day = dt.datetime(date.year, date.month, date.day)
+        kwargs.update(columns=["v", "p_l"])
+        kwargs.setdefault("verbose", False)
+        kwargs.pop("stream", None)
+        fd = FetchData(rad, [day, day + dt.timedelta(days=1)], **kwargs)
+        sources = source_stamps(fd.files)
+        store = CubeStore(cube_dir) if cube_dir is not None else None
+        cube = (
+            store.get(rad, day, date_range, sources) if store is not None else None
+        )
+        if cube is None:
+            frame = fd.fetch_frame()
+            if frame is None:
+                # Day not (yet) in the archive: nothing is stored so that
+                # a later call reads it once the files land
+                logger.warning(f"No frame {rad} on {day}, echo cube not built")
+                return None
+            cube = EchoCube.from_frame(
+                frame,
+                rad,
+                day,
+                fd.hdw_data.beams,
+                fd.hdw_data.gates,
+                time_res,
+                fd.soundings,
+                sources,
+            )
+            if store is not None:
+                store.put(cube)
+                if date_range is not None:
+                    cube = store.get(rad, day, date_range)
+        return cube
+
+
+class SDStore(object):
+    """
+    Range mode: each radar is fetched once over a whole span (e.g. a
+    month backfill) and held time sorted, events get zero-copy time
+    slices of it instead of re-reading the overlapping files.
+    """
+
+    def __init__(self, rads, date_range, **kwargs):
+        """
+        rads = radar codes
+        date_range = [ start_date, end_date ] covering all events
+        kwargs = FetchData.fetch options (n_procs, cache_dir, stream, ...)
+        """
+        self.rads = rads
+        self.date_range = date_range
+        self.kwargs = kwargs
+        self.dat, self.errors = {}, {}
+        return
+
+    def load(self):
+        """
+        Fetch every radar once, errors are kept per radar
+        """
+        for r in self.rads:
+            if (r in self.dat) or (r in self.errors):
+                continue
+            logger.info(f"Loading {r} over {self.date_range}")
+            try:
+                fd = FetchData.fetch(r, self.date_range, **self.kwargs)
+                for name in ["frame", "echoes"]:
+                    df = getattr(fd, name, None)
+                    if (df is not None) and (not df.time.is_monotonic_increasing):
+                        setattr(
+                            fd,
+                            name,
+                            df.sort_values("time", kind="stable").reset_index(
+                                drop=True
+                            ),
+                        )
+                self.dat[r] = fd
+            except Exception:
+                self.errors[r] = traceback.format_exc()
+        return self
+
+    def get(self, rads, date_range):
+        """
+        Time slices of the radars over date_range and the fetch errors
+        """
+        self.load()
+        dat = dict(
+            (r, self.dat[r].time_slice(date_range)) for r in rads if r in self.dat
+        )
+        errors = dict((r, self.errors[r]) for r in rads if r in self.errors)
+        return dat, errors
+
 
 class SDAnalysis(object):
     """
@@ -456,31 +1413,124 @@ class SDAnalysis(object):
     requried parameters for report.
     """
 
+    # Echo counts only need time and v, tfreq is used by plot_TS
+    columns = ["v", "tfreq"]
+
     def __init__(
         self,
         dates,
         rads=["bks", "fhe", "fhw"],
+        n_procs=1,
+        cache_dir=None,
+        index_db=None,
+        concurrent_rads=False,
+        compact=False,
+        mirror_dir=None,
+        stream=False,
+        store=None,
     ):
+        """
+        store = SDStore holding the radars over a span covering dates
+                (range mode), data are sliced from it instead of fetched
+        """
         self.dates = dates
         self.rads = rads
+        self.n_procs = n_procs
+        self.cache_dir = cache_dir
+        self.index_db = index_db
+        self.concurrent_rads = concurrent_rads
+        self.compact = compact
+        self.mirror_dir = mirror_dir
+        self.stream = stream
+        self.store = store
         return
 
+    def _fetch_kwargs(self):
+        return dict(
+            n_procs=self.n_procs,
+            cache_dir=self.cache_dir,
+            index_db=self.index_db,
+            columns=self.columns,
+            compact=self.compact,
+            mirror_dir=self.mirror_dir,
+            stream=self.stream,
+        )
+
     def get_SD_data(self):
         """
         Fetch data from local repo
         """
         if not hasattr(self, "dat"):
-            self.dat = {}
-            for r in self.rads:
-                logger.info(f"Loading {r}")
+            self.dat, self.errors = {}, {}
+            if self.store is not None:
+                self.dat, self.errors = self.store.get(self.rads, self.dates)
+            elif self.concurrent_rads and (len(self.rads) > 1):
+                self._get_SD_data_concurrent()
+            else:
+                for r in self.rads:
+                    logger.info(f"Loading {r}")
+                    try:
+                        self.dat[r] = FetchData.fetch(
+                            r, self.dates, **self._fetch_kwargs()
+                        )
+                    except Exception:
+                        self.errors[r] = traceback.format_exc()
+            if len(self.errors) > 0:
+                log = "\n".join(f"[{r}] {e}" for r, e in self.errors.items())
+                logger.error(f"Error fetching {list(self.errors.keys())} \n {log}")
+        return
+
+    def _get_SD_data_concurrent(self):
+        """
+        Fetch all radars at once, one worker process per radar
+        """
+        logger.info(f"Loading {self.rads} concurrently")
+        with ProcessPoolExecutor(max_workers=len(self.rads)) as pool:
+            futures = {
+                r: pool.submit(FetchData.fetch, r, self.dates, **self._fetch_kwargs())
+                for r in self.rads
+            }
+            for r, fut in futures.items():
                 try:
-                    fdata = FetchData.fetch(r, self.dates)
-                    self.dat[r] = fdata
-                except:
-                    log = traceback.print_exc()
-                    logger.error(f"Error fetching {r} \n {log}")
+                    self.dat[r] = fut.result()
+                except Exception as e:
+                    self.errors[r] = "".join(
+                        traceback.format_exception(type(e), e, e.__traceback__)
+                    )
         return
 
+    def _radar_echo_counts(self, r):
+        """
+        Echo counts per timestamp of one radar (series over time), None
+        if the radar has no data
+        """
+        if r not in self.dat.keys():
+            return None
+        if hasattr(self.dat[r], "echoes"):
+            return self.dat[r].echoes.groupby("time").v.sum()
+        elif hasattr(self.dat[r], "frame"):
+            return self.dat[r].frame.groupby("time").v.count()
+        return None
+
+    def echo_counts(self):
+        """
+        Echo counts per timestamp summed over the radars (time, v) and
+        the radars contributing. Uses the streamed counts if present,
+        else counts valid v of each radar's frame.
+        """
+        counts, rads = [], []
+        for r in self.rads:
+            o = self._radar_echo_counts(r)
+            if (o is not None) and (len(o) > 0):
+                rads.append(r)
+                counts.append(o)
+        if len(counts) == 0:
+            return pd.DataFrame(columns=["time", "v"]), rads
+        o = counts[0]
+        for c in counts[1:]:
+            o = o.add(c, fill_value=0)
+        return o.astype(int).reset_index(), rads
+
     # TODO
     def fetch_parameters(self, echoes, time):
         """
@@ -488,75 +1538,87 @@ class SDAnalysis(object):
         groundscatter echoes, extract timings and
         phases.
         """
-        scores = [0, 1, 2, 3]
-        descriptions = [
-            "Ineffective",
-            "Detectable",
-            "Moderate",
-            "Severe",
+        return swf_timings(echoes, time)
+
+    def fetch_parameters_batch(self, series):
+        """
+        Score many echo series (events / radars) at once
+        series: dict or list of (echoes, time)
+        """
+        if isinstance(series, dict):
+            return dict((k, swf_timings(e, t)) for k, (e, t) in series.items())
+        return [swf_timings(e, t) for e, t in series]
+
+    def _cube_echo_counts(self, r, cube_dir):
+        """
+        Echo counts per time bin of one radar from its echo cubes
+        """
+        kwargs = self._fetch_kwargs()
+        for k in ["columns", "stream"]:
+            kwargs.pop(k)
+        days = pd.date_range(
+            pd.Timestamp(self.dates[0]).floor("D"), self.dates[1], freq="D"
+        )
+        cubes = [
+            FetchData.fetch_echo_cube(r, d, cube_dir, date_range=self.dates, **kwargs)
+            for d in days
         ]
-        score = 0
-        description = descriptions[score]
-        o = pd.DataFrame()
-        o["echoes"], o["time"] = echoes, time
-        timings = {}
-        timings["median"] = np.median(echoes[:100])
-        timings["med"] = stats.median_absolute_deviation(echoes[:100])
-        if np.min(echoes) <= 0.5 * timings["median"]:
-            timings["peak_blackout"] = time[np.argmin(echoes)]
-            d = o[
-                (o.time < timings["peak_blackout"])
-                & (o.echoes >= 0.9 * timings["median"])
-            ]
-            if len(d) > 0:
-                timings["onset"] = d.time.tolist()[-1]
-                d = o[
-                    (o.time < timings["peak_blackout"])
-                    & (o.echoes < 0.5 * timings["median"])
-                ]
-                if len(d) > 0:
-                    timings["start_blackout"] = d.time.tolist()[0]
-                    d = o[
-                        (o.time > timings["peak_blackout"])
-                        & (o.echoes > 0.5 * timings["median"])
-                    ]
-                    if len(d) > 0:
-                        timings["end_blackout"] = d.time.tolist()[0]
-                        d = o[
-                            (o.time > timings["peak_blackout"])
-                            & (o.echoes >= 0.9 * timings["median"])
-                        ]
-                        if len(d) > 0:
-                            timings["recovery"] = d.time.tolist()[0]
-                        else:
-                            timings["recovery"] = o.time.tolist()[-5]
-                    else:
-                        timings["end_blackout"] = o.time.tolist()[-10]
-                        timings["recovery"] = o.time.tolist()[-5]
-                else:
-                    timings["end_blackout"] = o.time.tolist()[-10]
-                    timings["recovery"] = o.time.tolist()[-5]
-                d = o[
-                    (o.time >= timings["start_blackout"])
-                    & (o.time <= timings["end_blackout"])
-                ]
-                dmedian = np.median(d.echoes)
-                if dmedian <= 0.25 * timings["median"]:
-                    score = 3
-                    description = descriptions[score]
-                elif (dmedian <= 0.5 * timings["median"]) and (
-                    dmedian >= 0.25 * timings["median"]
-                ):
-                    score = 2
-                    description = descriptions[score]
-                elif (dmedian >= 0.5 * timings["median"]) and (
-                    dmedian <= 0.75 * timings["median"]
-                ):
-                    score = 1
-                    description = descriptions[score]
-        timings["score"] = str(score)
-        timings["description"] = description
-        return timings
+        # Days without data are left out
+        counts = [c.echo_counts(self.dates) for c in cubes if c is not None]
+        return pd.concat(counts) if len(counts) > 0 else None
+
+    def detect_states(self, freq="1min", cube_dir=None, climatologies={}, **kwargs):
+        """
+        Replay each radar's echo counts, summed per freq bin (about a
+        scan), through the online SWFDetector, bins without data are
+        skipped. Returns per radar the
+        states (one N/O/B/R per bin, as rad_states of config/events),
+        the transitions and the timings of the completed events.
+        cube_dir: Read the counts from the radar-day echo cubes there
+                  instead of the frames (None: frames)
+        climatologies: Quiet-day EchoClimatology per radar serving the
+                       baselines (radars left out use a running baseline),
+                       freq should match their time_res
+        kwargs: SWFDetector options (n_base, smooth_len, verbose)
+        """
+        if cube_dir is None:
+            self.get_SD_data()
+        detections = {}
+        for r in self.rads:
+            if cube_dir is None:
+                o = self._radar_echo_counts(r)
+            else:
+                o = self._cube_echo_counts(r, cube_dir)
+            if (o is None) or (len(o) == 0):
+                continue
+            # Bins without soundings stay NaN: a gap, not a blackout
+            o = o.resample(freq).sum(min_count=1)
+            states, transitions, det = replay(
+                o.index,
+                o.values,
+                rad=r,
+                climatology=climatologies.get(r, None),
+                **kwargs,
+            )
+            detections[r] = dict(
+                time=o.index,
+                states=states,
+                transitions=transitions,
+                events=det.events,
+            )
+        return detections
+
+    def daylight_fraction(self, times, rads, sza_th=90.0):
+        """
+        Fraction of (time, radar site) pairs in daylight (SZA < sza_th)
+        """
+        hdws = [get_hdw(r) for r in rads]
+        sza = solar_zenith(
+            np.asarray(times)[:, np.newaxis],
+            [h.geographic.lat for h in hdws],
+            [h.geographic.lon for h in hdws],
+        )
+        return float(np.mean(sza < sza_th))
 
     def plot_TS(self, bm=None):
         """
@@ -637,14 +1699,7 @@ class SDAnalysis(object):
             rotation=90,
         )
 
-        df = pd.DataFrame()
-        rads_conttributing = []
-        for i, r in enumerate(self.rads):
-            if r in self.dat.keys() and hasattr(self.dat[r], "frame"):
-                o = self.dat[r].frame
-                if len(o) > 0:
-                    rads_conttributing.append(r)
-                    df = pd.concat([df, o])
+        df, rads_conttributing = self.echo_counts()
 
         text = r"Operational Radars: [{}]".format(", ".join(rads_conttributing))
         ax.text(
@@ -658,14 +1713,13 @@ class SDAnalysis(object):
         )
         timings = {}
         if len(df) > 0:
-            df = df.groupby("time").count().reset_index()
-            timings = self.fetch_parameters(smooth(np.array(df.v)), df.time.tolist())
+            smoothed = smooth(np.array(df.v))
+            timings = self.fetch_parameters(smoothed, df.time)
             import pytz
             cet = pytz.timezone("US/Central")
             offset = cet.utcoffset(df.time.tolist()[0], is_dst=True)
             local_times = [t + offset for t in df.time.tolist()]
-            local_times_range = [int(l.hour > 8.0 and l.hour < 18) for l in local_times]
-            p = sum(local_times_range) / len(local_times_range)
+            p = self.daylight_fraction(df.time.values, rads_conttributing)
             logger.info(f"Probability {p}")
             if p < 0.1:
                 ax.text(
@@ -689,7 +1743,7 @@ class SDAnalysis(object):
                 twax.set_xlim(local_times[0], local_times[-1])
             else:
                 ax.plot(df.time, df.v, "ko", ms=1.2, alpha=0.8)
-                ax.plot(df.time, smooth(np.array(df.v)), "r-", lw=0.8, alpha=0.8)
+                ax.plot(df.time, smoothed, "r-", lw=0.8, alpha=0.8)
                 twax = ax.twiny()
                 twax.xaxis.set_major_formatter(mdates.DateFormatter(r"%H^{%M}"))
                 twax.xaxis.set_ticks_position("bottom")
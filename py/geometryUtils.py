@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""geometryUtils.py: utility module to share radar hardware and FoV geometry."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pydarn
+from loguru import logger
+from rad_fov import CalcFov
+
+# Process-wide memory tier, guarded by one lock so concurrent
+# consumers compute each geometry once
+_lock = threading.RLock()
+_hdw = {}
+_geometry = {}
+
+
+def get_hdw(rad):
+    """
+    Hardware info of a radar, read once per process
+    """
+    with _lock:
+        if rad not in _hdw:
+            _hdw[rad] = pydarn.read_hdw_file(rad)
+        return _hdw[rad]
+
+
+def hdw_version(hdw):
+    """
+    Short digest of the hardware info, changes with the hdw file
+    """
+    return hashlib.sha1(repr(hdw).encode("utf-8")).hexdigest()[:12]
+
+
+def _load(key, build, folder=None):
+    """
+    Geometry arrays of a key from memory, else from the .npz tier
+    in folder (if set), else built and stored in both
+    """
+    with _lock:
+        if key in _geometry:
+            return _geometry[key]
+        path = None
+        if folder is not None:
+            path = os.path.join(folder, "_".join(str(k) for k in key) + ".npz")
+        if (path is not None) and os.path.exists(path):
+            with np.load(path) as f:
+                arrays = dict(f)
+        else:
+            arrays = build()
+            if path is not None:
+                os.makedirs(folder, exist_ok=True)
+                tmp = path + f".{os.getpid()}.tmp"
+                with open(tmp, "wb") as fp:
+                    np.savez(fp, **arrays)
+                os.replace(tmp, path)
+                logger.info(f"Geometry cached: {path}")
+        # Shared between consumers, so never modified in place
+        for a in arrays.values():
+            a.setflags(write=False)
+        _geometry[key] = arrays
+        return arrays
+
+
+def get_fov(rad, model="IS", fov_dir="front", max_gate=None, folder=None):
+    """
+    FoV cell edges (latFull / lonFull) and centers (latCenter /
+    lonCenter) of a radar from CalcFov
+    max_gate: Number of gates (None: all gates of the hdw file)
+    folder: Folder of the on-disk .npz tier (None: memory only)
+    """
+    hdw = get_hdw(rad)
+    key = (rad, hdw_version(hdw), model, fov_dir, max_gate)
+
+    def build():
+        fov = CalcFov(hdw=hdw, model=model, fov_dir=fov_dir, ngates=max_gate)
+        return dict(
+            latFull=fov.latFull,
+            lonFull=fov.lonFull,
+            latCenter=fov.latCenter,
+            lonCenter=fov.lonCenter,
+        )
+
+    return _load(key, build, folder)
+
+
+def get_coords(rad, folder=None):
+    """
+    Geographic lat / lon of the FoV from pydarn.Coords
+    folder: Folder of the on-disk .npz tier (None: memory only)
+    """
+    hdw = get_hdw(rad)
+    key = (rad, hdw_version(hdw), "pydarn", "front", None)
+
+    def build():
+        lats, lons = pydarn.Coords.GEOGRAPHIC(hdw.stid)
+        return dict(lats=np.asarray(lats), lons=np.asarray(lons))
+
+    return _load(key, build, folder)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+"""indexUtils.py: utility module to index fitacf<v> archive files in SQLite."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import datetime as dt
+import os
+import sqlite3
+from contextlib import closing
+
+from loguru import logger
+
+
+class FitacfIndex(object):
+    """
+    Persistent SQLite index of the archive layout
+    {root}/{year}/{ftype}/{rad}/{YYYYmmdd}.{HHMM}.{SS}.{rad}.{ftype}.bz2
+    Radar folders are re-listed only when their mtime changes.
+    """
+
+    def __init__(self, db, root="/sd-data", file_hours=2, verbose=False):
+        """
+        db: SQLite database file
+        root: root folder of the archive
+        file_hours: time span covered by one file
+        """
+        self.db = db
+        self.root = root
+        self.file_hours = file_hours
+        self.verbose = verbose
+        if os.path.dirname(self.db):
+            os.makedirs(os.path.dirname(self.db), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY, rad TEXT, ftype TEXT,
+                    stime TEXT, etime TEXT, size INTEGER, mtime REAL
+                )"""
+            )
+            conn.execute(
+                """CREATE INDEX IF NOT EXISTS files_rad_time
+                ON files (rad, ftype, stime, etime)"""
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime REAL)"
+            )
+        return
+
+    def _connect(self):
+        return sqlite3.connect(self.db, timeout=60)
+
+    def _parse_fname(self, fname):
+        """
+        Start and end time of a file from its name
+        """
+        p = os.path.basename(fname).split(".")
+        stime = dt.datetime.strptime(p[0] + p[1] + p[2], "%Y%m%d%H%M%S")
+        return stime, stime + dt.timedelta(hours=self.file_hours)
+
+    def update(self, years=None, ftypes=None, rads=None):
+        """
+        Incrementally (re-)index the archive, optionally restricted to
+        some years, file types and radars
+        """
+        if not os.path.isdir(self.root):
+            return
+        years = years if years else sorted(os.listdir(self.root))
+        with closing(self._connect()) as conn, conn:
+            known = dict(conn.execute("SELECT path, mtime FROM folders").fetchall())
+            for year in years:
+                ydir = os.path.join(self.root, str(year))
+                if not os.path.isdir(ydir):
+                    continue
+                for ftype in ftypes if ftypes else sorted(os.listdir(ydir)):
+                    fdir = os.path.join(ydir, ftype)
+                    if not os.path.isdir(fdir):
+                        continue
+                    for rad in rads if rads else sorted(os.listdir(fdir)):
+                        rdir = os.path.join(fdir, rad)
+                        if not os.path.isdir(rdir):
+                            continue
+                        mtime = os.stat(rdir).st_mtime
+                        if known.get(rdir) != mtime:
+                            self._index_folder(conn, rdir, rad, ftype, mtime)
+        return
+
+    def _index_folder(self, conn, rdir, rad, ftype, mtime):
+        """
+        List one radar folder and sync its rows
+        """
+        if self.verbose:
+            logger.info(f"Indexing {rdir}")
+        rows = []
+        for e in os.scandir(rdir):
+            if e.name.endswith(f".{ftype}.bz2"):
+                try:
+                    stime, etime = self._parse_fname(e.name)
+                except ValueError:
+                    continue
+                st = e.stat()
+                rows.append(
+                    (
+                        e.path,
+                        rad,
+                        ftype,
+                        stime.isoformat(sep=" "),
+                        etime.isoformat(sep=" "),
+                        st.st_size,
+                        st.st_mtime,
+                    )
+                )
+        conn.execute("DELETE FROM files WHERE path LIKE ?", (rdir + os.sep + "%",))
+        conn.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?,?)", rows)
+        conn.execute("INSERT OR REPLACE INTO folders VALUES (?,?)", (rdir, mtime))
+        return
+
+    def query(self, rad, date_range, ftype="fitacf"):
+        """
+        Files of a radar that overlap [date_range[0], date_range[1]]
+        """
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                """SELECT path FROM files
+                WHERE rad=? AND ftype=? AND stime<=? AND etime>=?
+                ORDER BY stime""",
+                (
+                    rad,
+                    ftype,
+                    date_range[1].isoformat(sep=" "),
+                    date_range[0].isoformat(sep=" "),
+                ),
+            ).fetchall()
+        return [r[0] for r in rows]
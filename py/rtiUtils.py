@@ -19,14 +19,13 @@ import matplotlib.pyplot as plt
 plt.style.use(["science", "ieee"])
 plt.rcParams["font.family"] = "sans-serif"
 plt.rcParams["font.sans-serif"] = ["Tahoma", "DejaVu Sans", "Lucida Grande", "Verdana"]
-import datetime as dt
 
 import matplotlib.dates as mdates
 import model_vheight as mvh
 import mplstyle
 import numpy as np
 import tidUtils
-from pysolar.solar import get_altitude_fast
+from solarUtils import solar_zenith
 
 
 class RTI(object):
@@ -139,15 +138,12 @@ class RTI(object):
         """
         R = 6378.1
         gates = np.arange(gate_range[0], gate_range[1])
-        dn_grid = np.zeros((len(times), len(gates)))
-        for i, d in enumerate(times):
-            d = dt.datetime.utcfromtimestamp(d.astype(dt.datetime) * 1e-9).replace(
-                tzinfo=dt.timezone.utc
-            )
-            for j, g in enumerate(gates):
-                gdlat, glong = fov[0][g, beam], fov[1][g, beam]
-                angle = 90.0 - get_altitude_fast(gdlat, glong, d)
-                dn_grid[i, j] = angle
+        # time x gate in one broadcast call
+        dn_grid = solar_zenith(
+            np.asarray(times)[:, np.newaxis],
+            fov[0][gates, beam][np.newaxis, :],
+            fov[1][gates, beam][np.newaxis, :],
+        )
         terminator = np.zeros_like(dn_grid)
         terminator[dn_grid > self.angle_th] = 1.0
         terminator[dn_grid <= self.angle_th] = 0.0
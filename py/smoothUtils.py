@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+"""smoothUtils.py: utility module to smooth echo count series."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+WINDOWS = ["flat", "hanning", "hamming", "bartlett", "blackman"]
+# Windows at least this long are convolved through the FFT
+FFT_LEN = 64
+
+
+@lru_cache(maxsize=64)
+def get_kernel(window_len, window="hanning"):
+    """
+    Normalised smoothing kernel, built once per (window_len, window)
+    and shared read-only
+    """
+    if not window in WINDOWS:
+        raise ValueError(
+            "Window is on of 'flat', 'hanning', 'hamming', 'bartlett', 'blackman'"
+        )
+    w = (
+        np.ones(window_len, "d")
+        if window == "flat"
+        else getattr(np, window)(window_len)
+    )
+    w = w / w.sum()
+    w.setflags(write=False)
+    return w
+
+
+def _reflect(x, window_len):
+    """
+    Pad the series (last axis) with their reflections about the end points
+    """
+    return np.concatenate(
+        [
+            x[..., window_len - 1 : 0 : -1],
+            x,
+            x[..., -2 : -window_len - 1 : -1],
+        ],
+        axis=-1,
+    )
+
+
+def smooth_batch(x, window_len=101, window="hanning"):
+    """
+    Smooth many series at once (rows of a 2-D array, e.g. radars x
+    beams flattened) with a reflected-edge moving window. Flat windows
+    use a running sum, long windows the FFT and short ones a direct
+    convolution.
+    """
+    x = np.asarray(x, dtype=float)
+    if x.ndim != 2:
+        raise ValueError("smooth_batch only accepts 2 dimension arrays.")
+    if x.shape[1] < window_len:
+        raise ValueError("Input vector needs to be bigger than window size.")
+    if window_len < 3:
+        return x
+    w = get_kernel(window_len, window)
+    s = _reflect(x, window_len)
+    if window == "flat":
+        c = np.zeros((s.shape[0], s.shape[1] + 1))
+        np.cumsum(s, axis=1, out=c[:, 1:])
+        y = (c[:, window_len:] - c[:, :-window_len]) / window_len
+    elif window_len >= FFT_LEN:
+        y = fftconvolve(s, w[np.newaxis, :], mode="valid", axes=1)
+    else:
+        y = np.array([np.convolve(w, r, mode="valid") for r in s])
+    d = int((window_len - 1) / 2)
+    return y[:, d:-d]
+
+
+def smooth(x, window_len=101, window="hanning"):
+    """
+    Smooth a series with a reflected-edge moving window
+    """
+    if x.ndim != 1:
+        raise ValueError("smooth only accepts 1 dimension arrays.")
+    if x.size < window_len:
+        raise ValueError("Input vector needs to be bigger than window size.")
+    if window_len < 3:
+        return x
+    return smooth_batch(x[np.newaxis, :], window_len, window)[0]
+
+
+class StreamSmoother(object):
+    """
+    Causal smoothing for real-time use: the rising half of the window
+    (peak on the latest sample) over the latest window_len // 2 + 1
+    samples, renormalised while filling up. The flat window keeps a
+    running sum so each update is O(1).
+    """
+
+    def __init__(self, window_len=101, window="hanning"):
+        self.window = window
+        self.kernel = get_kernel(window_len, window)[: window_len // 2 + 1]
+        self.buffer = deque(maxlen=len(self.kernel))
+        self.total = 0.0
+        return
+
+    def update(self, x):
+        """
+        Add one sample, returns the smoothed value
+        """
+        if len(self.buffer) == self.buffer.maxlen:
+            self.total -= self.buffer[0]
+        self.buffer.append(x)
+        self.total += x
+        n = len(self.buffer)
+        if self.window == "flat":
+            return self.total / n
+        w = self.kernel[-n:]
+        return float(np.dot(w, self.buffer) / w.sum())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""solarUtils.py: utility module to compute solar zenith angles on arrays."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memoised zenith angles per (time, grid), least recently used dropped
+# beyond CACHE_SIZE entries
+CACHE_SIZE = 64
+_lock = threading.RLock()
+_cache = OrderedDict()
+
+
+def to_datetime64(times):
+    """
+    UTC datetime64[ns] array of datetimes / Timestamps / datetime64
+    (scalar or array like), naive times are taken as UTC
+    """
+    a = np.asarray(times)
+    if a.dtype.kind == "M":
+        return a.astype("datetime64[ns]")
+    t = pd.to_datetime(np.asarray(times, dtype=object).ravel(), utc=True)
+    return t.tz_convert(None).values.reshape(a.shape)
+
+
+def _zenith(t, lat, lon):
+    """
+    NOAA solar position (declination, equation of time, hour angle),
+    no refraction, arrays broadcast
+    """
+    sec = (t - np.datetime64("1970-01-01T00:00:00", "ns")) / np.timedelta64(1, "s")
+    jc = (sec / 86400.0 + 2440587.5 - 2451545.0) / 36525.0
+    L = np.deg2rad((280.46646 + jc * (36000.76983 + jc * 0.0003032)) % 360)
+    M = np.deg2rad(357.52911 + jc * (35999.05029 - 0.0001537 * jc))
+    ecc = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+    center = (
+        np.sin(M) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(2 * M) * (0.019993 - 0.000101 * jc)
+        + np.sin(3 * M) * 0.000289
+    )
+    omega = np.deg2rad(125.04 - 1934.136 * jc)
+    app_long = np.deg2rad(np.rad2deg(L) + center - 0.00569 - 0.00478 * np.sin(omega))
+    obliq = np.deg2rad(
+        23
+        + (26 + (21.448 - jc * (46.815 + jc * (0.00059 - jc * 0.001813))) / 60) / 60
+        + 0.00256 * np.cos(omega)
+    )
+    dec = np.arcsin(np.sin(obliq) * np.sin(app_long))
+    y = np.tan(obliq / 2) ** 2
+    # Equation of time (minutes)
+    eot = 4 * np.rad2deg(
+        y * np.sin(2 * L)
+        - 2 * ecc * np.sin(M)
+        + 4 * ecc * y * np.sin(M) * np.cos(2 * L)
+        - 0.5 * y**2 * np.sin(4 * L)
+        - 1.25 * ecc**2 * np.sin(2 * M)
+    )
+    tst = ((sec % 86400) / 60.0 + eot + 4 * lon) % 1440
+    ha = np.deg2rad(tst / 4 - 180)
+    lat = np.deg2rad(lat)
+    cos_z = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(ha)
+    return np.rad2deg(np.arccos(np.clip(cos_z, -1, 1)))
+
+
+def _digest(a):
+    return (a.shape, a.dtype.str, hashlib.sha1(a.tobytes()).hexdigest())
+
+
+def solar_zenith(times, lats, lons, cache=True):
+    """
+    Solar zenith angles (degrees) of times, lats and lons broadcast
+    together in one call, e.g. times[:, None] with lats / lons of a
+    grid. Results are memoised per (time, grid) and shared read-only.
+    """
+    t = to_datetime64(times)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if not cache:
+        return _zenith(t, lats, lons)
+    key = (_digest(t), _digest(lats), _digest(lons))
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    sza = np.asarray(_zenith(t, lats, lons))
+    sza.setflags(write=False)
+    with _lock:
+        _cache[key] = sza
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return sza
@@ -64,7 +64,18 @@ class Summary(object):
             self.flareTS.save(self.file_names["goes_file"])
             self.flareTS.close()
             # SD plot
-            self.sd = SDAnalysis(dates=[self.start_time, self.end_time], rads=self.rads)
+            self.sd = SDAnalysis(
+                dates=[self.start_time, self.end_time],
+                rads=self.rads,
+                n_procs=self.event.get("n_procs", 1),
+                cache_dir=self.event.get("cache_dir", None),
+                index_db=self.event.get("index_db", None),
+                concurrent_rads=self.event.get("concurrent_rads", False),
+                compact=self.event.get("compact", False),
+                mirror_dir=self.event.get("mirror_dir", None),
+                stream=self.event.get("stream", False),
+                store=self.event.get("store", None),
+            )
             setattr(self.sd, "sd_timings", self.sd.plot_summary_TS())
             self.sd.save(self.file_names["sd_file"])
             self.sd.close()
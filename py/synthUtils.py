@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""synthUtils.py: utility module to generate synthetic fitacf<v> files."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import bz2
+import datetime as dt
+import os
+
+import numpy as np
+import pydarnio
+from loguru import logger
+from pydarnio.dmap import superdarn_formats as sf
+
+# Station ids of the radars used in the summaries
+STIDS = dict(bks=33, fhe=204, fhw=205)
+# DMAP format code to numpy type of scalars / arrays
+S_CAST = {"c": np.int8, "h": np.int16, "i": int, "f": float, "s": str}
+A_CAST = {"c": np.int8, "h": np.int16, "i": np.int32, "f": np.float32}
+
+
+def synthetic_record(time, bmnum, scan, nrang, slist, stid, rng):
+    """
+    One fitacf record with every fitacf field set, echoes at slist
+    """
+    r = {}
+    for k, f in sf.Fitacf.types.items():
+        r[k] = S_CAST[f]("synthetic" if f == "s" else 0)
+    r.update(
+        {
+            "time.yr": np.int16(time.year),
+            "time.mo": np.int16(time.month),
+            "time.dy": np.int16(time.day),
+            "time.hr": np.int16(time.hour),
+            "time.mt": np.int16(time.minute),
+            "time.sc": np.int16(time.second),
+            "time.us": int(time.microsecond),
+            "stid": np.int16(stid),
+            "bmnum": np.int16(bmnum),
+            "scan": np.int16(scan),
+            "nrang": np.int16(nrang),
+            "frang": np.int16(180),
+            "rsep": np.int16(45),
+            "tfreq": np.int16(10500),
+            "intt.sc": np.int16(3),
+            "cp": np.int16(153),
+            "noise.sky": float(rng.random() * 10),
+        }
+    )
+    # Arrays follow the scalars in a DMAP record
+    for k in ["ptab", "ltab", "pwr0"]:
+        r.pop(k, None)
+    r["ptab"] = np.zeros(8, dtype=np.int16)
+    r["ltab"] = np.zeros((24, 2), dtype=np.int16)
+    r["pwr0"] = np.zeros(nrang, dtype=np.float32)
+    n = len(slist)
+    if n > 0:
+        for k, f in sf.Fitacf.fitted_fields.items():
+            r[k] = (rng.random(n) * 30).astype(A_CAST[f])
+        r["slist"] = np.asarray(slist, dtype=np.int16)
+        r["gflg"] = rng.integers(0, 2, n).astype(np.int8)
+    return r
+
+
+def write_synthetic_fitacf(
+    fname,
+    stime,
+    hours=2,
+    nbeams=16,
+    nrang=75,
+    scan_time=60,
+    density=0.3,
+    stid=0,
+    dip=None,
+    seed=0,
+):
+    """
+    Write a synthetic fitacf<v>.bz2 file of one radar
+    stime: start time of the file
+    scan_time: scan duration (s), beams are sounded in equal dwells
+    density: fraction of gates with an echo
+    dip: Optional [start, end] of an SWF-like blackout, the echo density
+         drops linearly to zero till the middle and recovers by the end
+    Returns number of records and size (bytes) of the raw DMAP
+    """
+    rng = np.random.default_rng(seed)
+    dwell = scan_time / nbeams
+    n = int(hours * 3600 / dwell)
+    records = []
+    for i in range(n):
+        time = stime + dt.timedelta(seconds=i * dwell)
+        bm, p = i % nbeams, density
+        if (dip is not None) and (dip[0] <= time <= dip[1]):
+            half = (dip[1] - dip[0]) / 2
+            p = density * abs((time - dip[0]) - half) / half
+        slist = np.flatnonzero(rng.random(nrang) < p)
+        records.append(
+            synthetic_record(time, bm, int(bm == 0), nrang, slist, stid, rng)
+        )
+    writer = pydarnio.SDarnWrite(pydarnio.dict2dmap(records))
+    writer.superDARN_file_structure_to_bytes(
+        [
+            sf.Fitacf.types,
+            sf.Fitacf.extra_fields,
+            sf.Fitacf.fitted_fields,
+            sf.Fitacf.elevation_fields,
+        ]
+    )
+    with bz2.open(fname, "wb") as f:
+        f.write(writer.dmap_bytearr)
+    return n, len(writer.dmap_bytearr)
+
+
+def create_synthetic_archive(
+    root,
+    rads,
+    date_range,
+    ftype="fitacf",
+    hours=2,
+    nbeams=16,
+    nrang=75,
+    scan_time=60,
+    density=0.3,
+    dip=None,
+):
+    """
+    Write synthetic files of the radars covering date_range into an
+    archive laid out as root/{year}/{ftype}/{rad}/{date}.{HHMM}.{SS}.{rad}.{ftype}.bz2
+    Returns the file names with their record counts and raw sizes
+    """
+    files = []
+    for i, rad in enumerate(rads):
+        folder = os.path.join(root, "{year}", ftype, rad)
+        stime = date_range[0].replace(hour=0, minute=0, second=0, microsecond=0)
+        stime += dt.timedelta(hours=hours * int(date_range[0].hour / hours))
+        j = 0
+        while stime < date_range[1]:
+            fname = os.path.join(
+                folder.format(year=stime.year),
+                f"{stime.strftime('%Y%m%d.%H%M.%S')}.{rad}.{ftype}.bz2",
+            )
+            os.makedirs(os.path.dirname(fname), exist_ok=True)
+            n, size = write_synthetic_fitacf(
+                fname,
+                stime,
+                hours,
+                nbeams,
+                nrang,
+                scan_time,
+                density,
+                STIDS.get(rad, 0),
+                dip,
+                seed=1000 * i + j,
+            )
+            logger.info(f"Synthetic file: {fname}, {n} records")
+            files.append((fname, n, size))
+            stime += dt.timedelta(hours=hours)
+            j += 1
+    return files
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+"""tailUtils.py: utility module to follow a growing fitacf<v> file."""
+
+__author__ = "Chakraborty, S."
+__copyright__ = ""
+__credits__ = []
+__license__ = "MIT"
+__version__ = "1.0."
+__maintainer__ = "Chakraborty, S."
+__email__ = "shibaji7@vt.edu"
+__status__ = "Research"
+
+import bz2
+import os
+
+import pydarn
+import pydarnio
+from loguru import logger
+
+
+class FitacfTail(object):
+    """
+    Follow one fitacf<v> (.bz2) file that is still being written. The
+    compressed byte offset and the decompressor state are kept between
+    reads, so each read only decompresses and decodes the bytes appended
+    since the previous one. Partial DMAP records are held back until
+    they are complete.
+    """
+
+    # DMAP record header: int32 code, int32 record size (header included)
+    HEADER = 8
+
+    def __init__(self, fname, verbose=False):
+        """
+        fname: fitacf<v> file, bz2 compressed or plain DMAP
+        """
+        self.fname = fname
+        self.verbose = verbose
+        self.compressed = fname.endswith(".bz2")
+        self.reset()
+        return
+
+    def reset(self):
+        """
+        Start again from the beginning of the file
+        """
+        self.offset = 0
+        self.nrec = 0
+        self.buf = bytearray()
+        self.decomp = bz2.BZ2Decompressor() if self.compressed else None
+        return
+
+    def _decompress(self, data):
+        """
+        Feed compressed bytes, a new decompressor is started at every
+        end of stream so multi-stream (concatenated) files are handled
+        """
+        out = []
+        while len(data) > 0:
+            out.append(self.decomp.decompress(data))
+            if not self.decomp.eof:
+                break
+            data = self.decomp.unused_data
+            self.decomp = bz2.BZ2Decompressor()
+        return b"".join(out)
+
+    def _complete_records(self):
+        """
+        Pop the complete DMAP records from the head of the buffer
+        """
+        pos, L = 0, len(self.buf)
+        while L - pos >= self.HEADER:
+            size = int.from_bytes(self.buf[pos + 4 : pos + 8], "little", signed=True)
+            if size < self.HEADER:
+                raise ValueError(f"Corrupt DMAP record in {self.fname} at {pos}")
+            if pos + size > L:
+                break
+            pos += size
+        chunk = bytes(self.buf[:pos])
+        del self.buf[:pos]
+        return chunk
+
+    def read(self, fields=None):
+        """
+        Decoded records appended since the last read, as dicts of
+        fields (all fields if None)
+        """
+        size = os.path.getsize(self.fname)
+        if size < self.offset:
+            # File was replaced or truncated
+            logger.warning(f"File shrank, re-reading: {self.fname}")
+            self.reset()
+        if size == self.offset:
+            return []
+        with open(self.fname, "rb") as fp:
+            fp.seek(self.offset)
+            data = fp.read(size - self.offset)
+        self.offset += len(data)
+        self.buf.extend(self._decompress(data) if self.compressed else data)
+        chunk = self._complete_records()
+        if len(chunk) == 0:
+            return []
+        reader = pydarn.SuperDARNRead(chunk, True)
+        records = []
+        while reader.cursor < reader.dmap_end_bytes:
+            record = reader.read_record()
+            if fields is None:
+                records.append(pydarnio.dmap2dict([record])[0])
+            else:
+                records.append(
+                    dict((k, record[k].value) for k in fields if k in record)
+                )
+        self.nrec += len(records)
+        if self.verbose:
+            logger.info(f"File:{self.fname}, +{len(records)} records")
+        return records
@@ -27,6 +27,30 @@ from calender_list import (
 )
 from drap import DRAP
 from summary import Summary
+from fetchUtils import SDAnalysis, SDStore
+
+def create_range_store(args, dates, events, color_codes):
+    """
+    Range mode: fetch each radar once over the span of all events,
+    events get time slices of it
+    """
+    spans = []
+    for date in dates:
+        try:
+            event = utils.select_event_by_color_code_date(events, color_codes, date)
+            if event["has_event"]:
+                spans.append((event["start_time"], event["end_time"]))
+        except:
+            log = traceback.print_exc()
+            logger.error(f"Error on {date} \n {log}")
+    if len(spans) == 0:
+        return None
+    date_range = [min(s[0] for s in spans), max(s[1] for s in spans)]
+    return SDStore(
+        args.rads, date_range, n_procs=args.n_procs, cache_dir=args.cache_dir,
+        index_db=args.index_db, columns=SDAnalysis.columns, compact=args.compact,
+        mirror_dir=args.mirror_dir, stream=args.stream,
+    )
 
 def run_summary_plots_event_analysis(args):
     """
@@ -39,11 +63,13 @@ def run_summary_plots_event_analysis(args):
         days = int((args.end_date - args.start_date).days)
         dates = [args.start_date + dt.timedelta(d) for d in range(days+1)]
     events, color_codes = utils.read_events()
+    store = create_range_store(args, dates, events, color_codes) if args.range_mode else None
     for date in dates:
         try:
             event = utils.select_event_by_color_code_date(events, color_codes, date)
             if event["has_event"]:
                 event.update(args.__dict__)
+                event["store"] = store
                 summary = Summary(event)
                 summary.create_overlap_summary_plot()
                 drap = DRAP(event, only_xrap=True)
@@ -90,6 +116,30 @@ if __name__ == "__main__":
     parser.add_argument(
         "-r", "--rads", default="fhe-fhw-bks", type=str, help="Radars / Sep: '-', fhe-fhw-..."
     )
+    parser.add_argument(
+        "-np", "--n_procs", default=1, type=int, help="Number of processes to decode fitacf files"
+    )
+    parser.add_argument(
+        "-cd", "--cache_dir", default=None, type=str, help="Folder to cache decoded fitacf files"
+    )
+    parser.add_argument(
+        "-idx", "--index_db", default=None, type=str, help="SQLite index of fitacf files"
+    )
+    parser.add_argument(
+        "-cr", "--concurrent_rads", action="store_true", help="Fetch radars concurrently"
+    )
+    parser.add_argument(
+        "-cm", "--compact", action="store_true", help="Store SD frames with compact dtypes"
+    )
+    parser.add_argument(
+        "-md", "--mirror_dir", default=None, type=str, help="Folder to mirror decompressed fitacf files"
+    )
+    parser.add_argument(
+        "-ss", "--stream", action="store_true", help="Stream SD echo counts instead of building frames"
+    )
+    parser.add_argument(
+        "-rm", "--range_mode", action="store_true", help="Fetch each radar once over the whole date range"
+    )
     args = parser.parse_args()
     for k in vars(args).keys():
         print("     ", k, "->", str(vars(args)[k]))